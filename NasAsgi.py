@@ -0,0 +1,225 @@
+"""
+NAS 서버용 비동기(ASGI) 실행 모드.
+
+Flask 앱(WSGI)을 그대로 감싸서 같은 라우트를 ASGI로 노출합니다.
+- 연결 유지(keep-alive), 요청 본문 수신, 응답 전송 대기는 이벤트 루프가 처리하므로 스레드를 점유하지 않습니다.
+- 라우트 실행(파일시스템/아카이브/SQLite 작업)과 응답 청크 생성만 크기가 제한된 스레드 풀에서 수행합니다.
+- 응답은 청크 단위로 즉시 전송됩니다. (SSE scan_stream, 번들, 스트리밍 목록, 대용량 파일)
+- 클라이언트가 연결을 끊으면(http.disconnect) 다음 청크를 만들지 않고 응답 이터레이터를 닫아 스레드와 슬롯을 돌려줍니다.
+- 처리 중인 요청 수를 스레드 수로 제한합니다. 넘치는 요청은 스레드 풀 대기열에 쌓지 않고, 작은 별도 풀에서
+  과부하 표시(NasShared.OVERLOAD_ENVIRON_KEY)를 달고 실행해 서버의 부하 제어 저하 응답/503 경로로 바로 보냅니다.
+
+사용법: 각 서버의 SERVE_MODE = 'asgi' (uvicorn 필요: pip install uvicorn)
+"""
+import asyncio, contextvars, io, sys, logging
+from concurrent.futures import ThreadPoolExecutor
+import NasShared
+
+logger = logging.getLogger("NasAsgi")
+
+FILE_CHUNK_SIZE = 256 * 1024
+SHED_WORKERS = 2  # 과부하 요청(저하 응답/503)을 만드는 스레드 수
+SHED_MAX_IN_FLIGHT = 64  # 이보다 많이 밀리면 Flask를 거치지 않고 이벤트 루프에서 바로 503
+OVERLOAD_RETRY_AFTER = 2
+
+
+class InFlight:
+    """실행 풀에 들어가 있는 요청 수. 이벤트 루프 안에서만 바꾸므로 잠금이 필요 없습니다.
+    serve_many에서는 여러 앱이 하나를 공유해 스레드 풀 전체 기준으로 제한합니다."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.shedding = 0
+        self.stats = {'overloaded': 0, 'refused': 0, 'disconnected': 0}
+
+
+def fit_admission(admission, max_workers):
+    """부하 제어 대기 요청이 실행 스레드를 모두 점유하지 않도록, 대기 수 상한을 '스레드 수 - 전체 동시 실행 수'로 맞춥니다."""
+    if admission is None: return
+    admission.max_waiters = max(0, max_workers - admission.total_limit)
+    if admission.total_limit >= max_workers:
+        logger.warning(f"Admission total limit {admission.total_limit} >= ASGI workers {max_workers}: requests will not queue")
+
+
+class _FileWrapper:
+    """wsgi.file_wrapper: 파일 응답을 큰 청크로 읽어 스레드 풀 왕복 횟수를 줄입니다."""
+
+    def __init__(self, f, buffer_size=8192):
+        self.f = f
+        self.buffer_size = max(buffer_size, FILE_CHUNK_SIZE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = self.f.read(self.buffer_size)
+        if not data: raise StopIteration
+        return data
+
+    def close(self):
+        if hasattr(self.f, 'close'): self.f.close()
+
+
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': _FileWrapper,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type': key = 'CONTENT_TYPE'
+        elif name == 'content-length': key = 'CONTENT_LENGTH'
+        else: key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def make_asgi_app(wsgi_app, max_workers=32, executor=None, in_flight=None, shed_executor=None):
+    """WSGI 앱을 ASGI 앱으로 감쌉니다. 라우트 코드는 max_workers 크기의 스레드 풀에서만 실행됩니다.
+    executor / in_flight / shed_executor를 넘기면 여러 앱이 같은 스레드 풀과 한도를 나눠 씁니다. (다중 라이브러리 호스트)"""
+    owns_executor, owns_shed_executor = executor is None, shed_executor is None
+    if owns_executor: executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi")
+    if owns_shed_executor: shed_executor = ThreadPoolExecutor(max_workers=SHED_WORKERS, thread_name_prefix="asgi-shed")
+    if in_flight is None: in_flight = InFlight(max_workers)
+    done = object()
+
+    async def respond(pool, scope, environ, receive, send):
+        loop = asyncio.get_running_loop()
+        # Flask의 요청 컨텍스트는 contextvars 기반이므로, 한 요청의 모든 단계를 같은 Context에서 실행합니다.
+        # (청크마다 다른 풀 스레드에서 실행되어도 stream_with_context가 정상 동작)
+        ctx = contextvars.copy_context()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+            return lambda data: None
+
+        def run(fn, *args):
+            return loop.run_in_executor(pool, ctx.run, fn, *args)
+
+        # 서버의 send()는 연결이 끊겨도 조용히 반환하므로, 끊김은 receive()의 http.disconnect로만 알 수 있습니다.
+        # (본문을 모두 받은 뒤의 receive()는 연결이 끊길 때까지 기다립니다)
+        disconnected = asyncio.Event()
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect': pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch())
+        result = None
+        try:
+            result = await run(wsgi_app, environ, start_response)
+            iterator = iter(result)
+            while not disconnected.is_set():
+                chunk = await run(next, iterator, done)
+                if disconnected.is_set(): break
+                if 'sent' not in started:
+                    await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+                    started['sent'] = True
+                if chunk is done: break
+                if chunk: await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if disconnected.is_set():
+                in_flight.stats['disconnected'] += 1
+                logger.info(f"Client disconnected during {scope['path']}")
+            else:
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError as e:
+            logger.info(f"Client disconnected during {scope['path']}: {e}")
+        finally:
+            watcher.cancel()
+            if hasattr(result, 'close'): await run(result.close)
+
+    async def asgi_app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                msg = await receive()
+                if msg['type'] == 'lifespan.startup': await send({'type': 'lifespan.startup.complete'})
+                elif msg['type'] == 'lifespan.shutdown':
+                    if owns_executor: executor.shutdown(wait=False)
+                    if owns_shed_executor: shed_executor.shutdown(wait=False)
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http': return
+
+        body = b''
+        while True:
+            msg = await receive()
+            if msg['type'] == 'http.disconnect': return
+            body += msg.get('body', b'')
+            if not msg.get('more_body'): break
+
+        environ = build_environ(scope, body)
+        if in_flight.active < in_flight.limit:
+            in_flight.active += 1
+            try: await respond(executor, scope, environ, receive, send)
+            finally: in_flight.active -= 1
+            return
+        # 모든 실행 스레드가 사용 중: 대기열에 쌓지 않고 과부하 경로로 보냅니다.
+        in_flight.stats['overloaded'] += 1
+        if in_flight.shedding >= SHED_MAX_IN_FLIGHT:
+            in_flight.stats['refused'] += 1
+            await send({'type': 'http.response.start', 'status': 503,
+                        'headers': [(b'content-type', b'text/plain'), (b'retry-after', str(OVERLOAD_RETRY_AFTER).encode())]})
+            await send({'type': 'http.response.body', 'body': b'Server Busy', 'more_body': False})
+            return
+        environ[NasShared.OVERLOAD_ENVIRON_KEY] = True
+        in_flight.shedding += 1
+        try: await respond(shed_executor, scope, environ, receive, send)
+        finally: in_flight.shedding -= 1
+
+    asgi_app.in_flight = in_flight
+    return asgi_app
+
+
+def serve(wsgi_app, host, port, max_workers=32, admission=None):
+    """uvicorn으로 ASGI 모드를 실행합니다. admission: 앱의 NasShared.AdmissionControl (대기 수 상한을 스레드 수에 맞춤)"""
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("uvicorn not found. ASGI mode requires: pip install uvicorn")
+        raise
+    fit_admission(admission, max_workers)
+    uvicorn.run(make_asgi_app(wsgi_app, max_workers), host=host, port=port, log_level="info",
+                timeout_keep_alive=75, backlog=4096)
+
+
+def serve_many(wsgi_apps, host, max_workers=32, admission=None):
+    """여러 포트의 WSGI 앱을 한 이벤트 루프와 한 스레드 풀로 실행합니다. wsgi_apps: {port: wsgi_app}"""
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("uvicorn not found. ASGI mode requires: pip install uvicorn")
+        raise
+    fit_admission(admission, max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi")
+    shed_executor = ThreadPoolExecutor(max_workers=SHED_WORKERS, thread_name_prefix="asgi-shed")
+    in_flight = InFlight(max_workers)
+    servers = [uvicorn.Server(uvicorn.Config(make_asgi_app(app, executor=executor, in_flight=in_flight,
+                                                           shed_executor=shed_executor), host=host, port=port,
+                                             log_level="info", timeout_keep_alive=75, backlog=4096))
+               for port, app in wsgi_apps.items()]
+
+    async def main():
+        await asyncio.gather(*(server.serve() for server in servers))
+
+    asyncio.run(main())
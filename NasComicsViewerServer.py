@@ -1,8 +1,12 @@
 from flask import Flask, jsonify, send_from_directory, request, send_file, Response, render_template_string, \
-    stream_with_context, redirect
-import os, urllib.parse, unicodedata, logging, time, zipfile, io, sys, sqlite3, json, threading, hashlib, yaml, queue
-import urllib.request
-from concurrent.futures import ThreadPoolExecutor
+    stream_with_context, redirect, g
+import os, urllib.parse, unicodedata, logging, time, zipfile, io, sys, sqlite3, json, threading, hashlib, yaml, struct, base64, zlib
+import itertools
+import urllib.request, shutil, subprocess, bisect, heapq, multiprocessing, abc
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import OrderedDict
+import NasShared
 
 # [로그 설정]
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s', stream=sys.stdout)
@@ -16,9 +20,92 @@ METADATA_DB_PATH = '/volume2/video/NasComicsViewer_v7.db'
 
 ALLOWED_CATEGORIES = ["완결A", "완결B", "마블", "번역", "연재", "작가"]
 FLATTEN_CATEGORIES = ["완결A", "완결B", "번역", "연재"]
+FACET_KINDS = ["writers", "genres", "tags", "publisher", "status"]
+
+# 자동완성(/suggest) 색인
+SUGGEST_SERIES_DEPTH = 3  # 카테고리/초성/시리즈
+SUGGEST_WORD_STARTS = 4  # 제목 중간 단어로 시작하는 검색도 허용 (단어 경계 최대 4곳)
+SUGGEST_DELTA_MAX = 4096  # 증분 키가 이만큼 쌓이면 압축 세그먼트로 병합
+SUGGEST_SCAN_MAX = 5000  # 접두사 구간이 이보다 넓으면 (짧은 접두사) 상위 결과를 세그먼트 세대별로 캐시
+SUGGEST_VIEW_WEIGHT = 5  # 인기도 = 화수/작품 수 + 조회수 * 가중치
+
+# 변경 로그 / 증분 동기화(/changes)
+CHANGES_PAGE_SIZE = 5000
+CHANGES_RETENTION_SEC = 30 * 24 * 3600  # 삭제 기록 보존 기간. 이보다 오래된 커서는 전체 재동기화
+CHANGES_COMPACT_INTERVAL = 3600
+
+# 실행 모드: 'threaded' (Flask 기본, 요청당 스레드) | 'asgi' (NasAsgi + uvicorn, 제한된 스레드 풀)
+SERVE_MODE = 'threaded'
+ASGI_WORKERS = 32
+
+# 파일시스템 감시 (선택): 'auto'는 로컬 디스크면 inotify, 네트워크 마운트이거나 inotify가 없으면 mtime 폴링
+WATCHER_ENABLED = False
+WATCHER_MODE = 'auto'  # 'auto' | 'inotify' | 'poll'
+WATCHER_DEBOUNCE_SEC = 5
+WATCHER_POLL_INTERVAL = 60
+
+# RAR/7z 등 솔리드·비탐색 아카이브를 한 번 풀어두는 페이지 캐시 (LRU, 디스크 용량 상한)
+PAGE_CACHE_DIR = os.path.join(os.path.dirname(METADATA_DB_PATH), "comics_page_cache")
+PAGE_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+# 열린 ZIP 핸들 재사용 (다중 라이브러리 호스트에서는 모든 라이브러리가 하나를 공유)
+ARCHIVE_HANDLE_LIMIT = 64
+
+# 인덱스 스냅샷 / 읽기 전용 복제 모드
+# 복제 서버는 REPLICA_SOURCE(원본 서버 URL 또는 스냅샷이 놓이는 공유 폴더)에서 새 스냅샷을 받아 원자적으로 교체합니다.
+SNAPSHOT_DIR = os.path.join(os.path.dirname(METADATA_DB_PATH), "comics_snapshots")
+SNAPSHOT_KEEP = 3
+SNAPSHOT_INTERVAL = 0  # 원본 서버의 자동 스냅샷 주기(초), 0이면 수동(/metadata/snapshot/export)
+REPLICA_MODE = False
+REPLICA_SOURCE = ''  # 예: 'http://192.168.0.10:5555' 또는 '/volume2/video/comics_snapshots'
+REPLICA_POLL_INTERVAL = 300
 
-db_queue = queue.Queue()
 scanning_pool = ThreadPoolExecutor(max_workers=10)
+manifest_pool = ThreadPoolExecutor(max_workers=2)  # 아카이브 매니페스트 생성은 낮은 동시성으로 (디스크 경합 방지)
+archive_handles = NasShared.ArchiveHandlePool(ARCHIVE_HANDLE_LIMIT)
+
+# 포스터 플레이스홀더(LQIP) 생성: 이미지 읽기는 스레드, 디코딩/축소는 프로세스 풀에서 수행
+# 프로세스 풀은 start_services()에서 spawn 방식으로 만듭니다. (여러 스레드가 돌고 있는 프로세스를 fork하지 않도록)
+# 다중 라이브러리 호스트는 모든 만화 라이브러리가 함께 쓰는 풀을 미리 넣어 둡니다.
+PLACEHOLDER_BATCH_SIZE = 32  # 한 번에 메모리에 올리는 포스터 이미지 수
+placeholder_pool = ThreadPoolExecutor(max_workers=2)
+placeholder_proc_pool = None
+placeholder_pending = set()
+placeholder_lock = threading.Lock()
+
+# 직렬화된 응답 캐시 (/scan, /search, /metadata, /browse): key -> (bytes, tags), LRU + 메모리 상한
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+response_cache = OrderedDict()
+response_cache_tags = {}  # tag -> set(key)
+response_cache_lock = threading.Lock()
+response_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "stale_skips": 0, "bytes": 0}
+# 무효화할 때마다 1씩 증가. 조회 전에 읽은 값과 다르면 그 사이 쓰기가 있었으므로 결과를 캐시하지 않습니다.
+response_cache_generation = 0
+
+# 대용량 목록 스트리밍: 자식 수가 이 값을 넘으면 /metadata 챕터를 DB 커서에서 바로 스트리밍합니다.
+METADATA_STREAM_THRESHOLD = 1000
+STREAM_BATCH_SIZE = 500
+COMPRESS_MIN_BYTES = 1024
+
+# 빠른 JSON 직렬화 / brotli 압축 라이브러리 체크
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# 이미지 리사이즈용 라이브러리 체크 (번들 전송 시 선택적으로 사용)
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    logger.warning("Pillow (PIL) not found. Bundle pages will be sent at original size. Install with: pip install pillow")
 
 
 def normalize_nfc(s):
@@ -31,29 +118,508 @@ def get_path_hash(path):
     return hashlib.md5(normalize_nfc(p).encode('utf-8')).hexdigest()
 
 
+def subtree_clause(rel_path, column='rel_path'):
+    """rel_path 아래 전체(rel_path/...)를 고르는 SQL 조건과 인자. 요청의 카테고리 경로에 쓰므로 예전 LIKE처럼 ASCII 대소문자는 무시하고,
+    %, _ 는 와일드카드가 아닌 글자 그대로 비교합니다."""
+    prefix = normalize_nfc(rel_path).strip('/') + '/'
+    return f"substr({column}, 1, ?) = ? COLLATE NOCASE", [len(prefix), prefix]
+
+
 def get_depth(rel_path):
     if not rel_path or rel_path == ".": return 0
     return len(rel_path.strip('/').split('/'))
 
 
 # --- DB 엔진 ---
-def db_writer_worker():
+# 색인 쓰기는 save_entries / delete_entries(호출한 쪽의 연결을 받음)와 db_write(fn, *args)로만 합니다.
+# 다중 라이브러리 호스트는 이 세 함수를 공용 DB 쓰기 스레드로 바꿔 끼웁니다. (init_db의 스키마 생성과 별도 파일인 스냅샷 내보내기는 제외)
+def db_write(fn, *args):
+    """fn(conn, *args)를 쓰기용 연결로 실행하고 결과를 반환합니다. fn이 직접 커밋합니다."""
     conn = sqlite3.connect(METADATA_DB_PATH, timeout=60)
-    conn.execute('PRAGMA journal_mode=WAL;')
-    conn.execute('PRAGMA synchronous=NORMAL;')
-    while True:
-        items = db_queue.get()
-        if items is None: break
+    try: return fn(conn, *args)
+    finally: conn.close()
+
+
+def get_facet_values(meta_json):
+    """metadata JSON에서 (kind, value) 패싯 목록을 뽑아냅니다."""
+    try: m = json.loads(meta_json or '{}')
+    except: return []
+    pairs = set()
+    for kind in FACET_KINDS:
+        vals = m.get(kind)
+        if isinstance(vals, str): vals = vals.split(',') if kind in ('writers', 'genres', 'tags') else [vals]
+        if not isinstance(vals, list): continue
+        for v in vals:
+            v = normalize_nfc(v).strip()
+            if v and v != 'Unknown': pairs.add((kind, v))
+    return list(pairs)
+
+
+def index_facets(conn, items):
+    """entries 항목(폴더=시리즈)의 작가/장르/태그/출판사/상태를 패싯 테이블에 반영합니다."""
+    hashes = [(it[0],) for it in items]
+    conn.executemany("DELETE FROM entry_facets WHERE path_hash = ?", hashes)
+    links = []
+    for it in items:
+        if it[5] != 1: continue
+        for kind, value in get_facet_values(it[10]):
+            conn.execute("INSERT OR IGNORE INTO facets (kind, value) VALUES (?, ?)", (kind, value))
+            links.append((kind, value, it[0]))
+    if links:
+        conn.executemany("INSERT OR IGNORE INTO entry_facets (facet_id, path_hash) "
+                         "SELECT id, ? FROM facets WHERE kind = ? AND value = ?",
+                         [(h, k, v) for k, v, h in links])
+
+
+def log_changes(conn, items):
+    """저장할 items 중 실제로 내용이 바뀐 행만 변경 로그에 남깁니다. (last_scanned만 바뀐 재스캔은 기록하지 않음)"""
+    hashes = list(set(it[0] for it in items))
+    current = {}
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        for r in conn.execute(f"SELECT * FROM entries WHERE path_hash IN ({','.join('?' * len(chunk))})", chunk):
+            current[r[0]] = tuple(r[:9]) + (r[10],)
+    now = time.time()
+    changes = [(it[0], it[3], 'u' if it[0] in current else 'i', now) for it in items
+               if current.get(it[0]) != tuple(it[:9]) + (it[10],)]
+    if changes: conn.executemany("INSERT INTO changes (path_hash, rel_path, op, changed) VALUES (?, ?, ?, ?)", changes)
+
+
+def save_entries(conn, items):
+    """entries 저장의 단일 진입점. 변경 로그와 같은 트랜잭션으로 커밋한 뒤 해당 경로에 걸린 응답 캐시를 무효화합니다."""
+    if REPLICA_MODE: return  # 복제 서버는 스냅샷만 제공하며 색인을 수정하지 않습니다.
+    if not conn.in_transaction: conn.execute('BEGIN IMMEDIATE')
+    log_changes(conn, items)
+    conn.executemany('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', items)
+    index_facets(conn, items)
+    conn.commit()
+    cache_invalidate_items(items)
+    suggest_update(conn, items)
+
+
+def delete_entries(conn, rows):
+    """entries 행들을 패싯 연결과 함께 삭제하고 응답 캐시를 무효화합니다."""
+    if not rows or REPLICA_MODE: return
+    hashes = [(r[0],) for r in rows]
+    now = time.time()
+    conn.executemany("INSERT INTO changes (path_hash, rel_path, op, changed) VALUES (?, ?, 'd', ?)",
+                     [(r[0], r[3], now) for r in rows])
+    conn.executemany("DELETE FROM entries WHERE path_hash = ?", hashes)
+    conn.executemany("DELETE FROM entry_facets WHERE path_hash = ?", hashes)
+    conn.commit()
+    cache_invalidate_items(rows)
+    suggest_index.remove([h for h, in hashes])
+
+
+# --- 자동완성 색인 ---
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSUNG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+# 겹자음/겹모음은 입력 순서대로 풀어 둡니다. (입력 중인 '닭'이 '달기'의 접두사가 되도록)
+JAMO_SPLIT = {'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ', 'ㄽ': 'ㄹㅅ', 'ㄾ': 'ㄹㅌ',
+              'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ', 'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ',
+              'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ'}
+SUGGEST_KINDS = ('series', 'writer')
+
+
+def build_hangul_tables():
+    """음절 11172자의 자모 분해/초성 변환표 (str.translate용)."""
+    jamo = {ord(k): v for k, v in JAMO_SPLIT.items()}
+    cho = {}
+    for code in range(11172):
+        jung, jong = JUNGSUNG[code // 28 % 21], JONGSUNG[code % 28]
+        jamo[0xAC00 + code] = CHOSUNG[code // 588] + JAMO_SPLIT.get(jung, jung) + (JAMO_SPLIT.get(jong, jong) if code % 28 else '')
+        cho[0xAC00 + code] = CHOSUNG[code // 588]
+    return jamo, cho
+
+
+HANGUL_JAMO_TABLE, HANGUL_CHOSUNG_TABLE = build_hangul_tables()
+
+
+def decompose_hangul(s):
+    return s.translate(HANGUL_JAMO_TABLE)
+
+
+def get_chosung(s):
+    return s.translate(HANGUL_CHOSUNG_TABLE)
+
+
+def suggest_words(text):
+    return ''.join(ch if ch.isalnum() else ' ' for ch in normalize_nfc(text).lower()).split()
+
+
+def suggest_keys(text):
+    """용어 하나의 색인 키: 단어 경계마다 시작하는 (공백 제거된) 접미사의 자모 분해형과 초성형."""
+    words = suggest_words(text)
+    keys = set()
+    for i in range(min(len(words), SUGGEST_WORD_STARTS)):
+        s = ''.join(words[i:])
+        keys.add(('jamo', decompose_hangul(s)))
+        cho = get_chosung(s)
+        if cho != s: keys.add(('chosung', cho))
+    return keys
+
+
+class SuggestSegment:
+    """정렬된 키를 하나의 문자열에 이어 붙이고 오프셋/용어 ID를 array에 담은 불변 접두사 색인.
+    노드마다 dict를 두는 트라이 대신, 평탄화된 정렬 배열에서 이분 탐색으로 접두사 구간을 찾습니다."""
+    __slots__ = ('blob', 'offs', 'ids')
+
+    def __init__(self, pairs=()):
+        keys, ids = [], array('I')
+        for k, t in pairs:
+            keys.append(k); ids.append(t)
+        self.blob = ''.join(keys)
+        self.offs = array('I', itertools.accumulate(map(len, keys), initial=0))
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def key(self, i):
+        return self.blob[self.offs[i]:self.offs[i + 1]]
+
+    def lower_bound(self, s):
+        lo, hi = 0, len(self.ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < s: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def prefix_range(self, prefix):
+        return self.lower_bound(prefix), self.lower_bound(prefix + '\uffff')
+
+    def pairs(self):
+        return ((self.key(i), self.ids[i]) for i in range(len(self.ids)))
+
+
+class SuggestIndex:
+    """시리즈 제목/작가 자동완성 색인.
+    압축 세그먼트(SuggestSegment) + 작은 정렬 리스트(delta)의 2단 구조로, 스캐너의 증분 갱신은 delta에 쌓였다가
+    SUGGEST_DELTA_MAX를 넘으면 병합됩니다. 용어 속성(표시 문자열/종류/경로/인기도)은 용어 ID로 인덱싱되는 병렬 배열입니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.segments = {'jamo': SuggestSegment(), 'chosung': SuggestSegment()}
+        self.delta = {'jamo': [], 'chosung': []}
+        self.text, self.ref, self.kind = [], [], bytearray()
+        self.count, self.hits, self.score, self.alive = array('I'), array('I'), array('I'), bytearray()
+        self.by_ref = {}  # ('s', path_hash) 또는 ('w', 작가명) -> 용어 ID
+        self.series_writers = {}  # path_hash -> 작가 튜플 (작가 인기도 증감용)
+        self.dead = 0
+        self.generation = 0
+        self.wide_cache = {}
+
+    def _new_term(self, kind, text, ref):
+        tid = len(self.text)
+        self.text.append(text); self.ref.append(ref); self.kind.append(kind)
+        self.count.append(0); self.hits.append(0); self.score.append(0); self.alive.append(1)
+        for name, key in suggest_keys(text): self.delta[name].append((key, tid))
+        return tid
+
+    def _kill(self, tid):
+        self.alive[tid] = 0
+        self.text[tid] = ''; self.ref[tid] = None
+        self.dead += 1
+
+    def _set_count(self, tid, count):
+        self.count[tid] = max(count, 0)
+        self.score[tid] = self.count[tid] + SUGGEST_VIEW_WEIGHT * self.hits[tid]
+
+    def _add_writer(self, name, delta):
+        tid = self.by_ref.get(('w', name))
+        if tid is None:
+            if delta < 0: return
+            tid = self.by_ref[('w', name)] = self._new_term(1, name, None)
+        self._set_count(tid, self.count[tid] + delta)
+        if not self.count[tid]:
+            self._kill(tid); del self.by_ref[('w', name)]
+
+    def _put_series(self, path_hash, rel_path, title, writers, count):
+        tid = self.by_ref.get(('s', path_hash))
+        if tid is not None and self.text[tid] != title:
+            self._kill(tid); tid = None
+        if tid is None:
+            tid = self.by_ref[('s', path_hash)] = self._new_term(0, title, rel_path)
+        self.ref[tid] = rel_path
+        if count is not None: self._set_count(tid, count)
+        old, new = set(self.series_writers.get(path_hash, ())), set(writers)
+        for w in old - new: self._add_writer(w, -1)
+        for w in new - old: self._add_writer(w, 1)
+        self.series_writers[path_hash] = tuple(new)
+
+    def _merge(self):
+        for name in self.segments:
+            delta = sorted(self.delta[name])
+            merged = heapq.merge(self.segments[name].pairs(), delta)
+            self.segments[name] = SuggestSegment(p for p in merged if self.alive[p[1]])
+            self.delta[name] = []
+        self.dead = 0
+        self.generation += 1
+        self.wide_cache.clear()
+
+    def _settle(self):
+        for name in self.delta: self.delta[name].sort()
+        if max(len(d) for d in self.delta.values()) > SUGGEST_DELTA_MAX or self.dead > len(self.text) // 4:
+            self._merge()
+
+    def build(self, conn):
+        """entries 전체에서 색인을 새로 만듭니다. (시작 시, 복제 스냅샷 교체 시)"""
+        rows = conn.execute("SELECT path_hash, rel_path, name, title, metadata FROM entries WHERE is_dir = 1 AND depth = ?",
+                            (SUGGEST_SERIES_DEPTH,)).fetchall()
+        counts = dict(conn.execute("SELECT parent_hash, COUNT(*) FROM entries WHERE depth = ? GROUP BY parent_hash",
+                                   (SUGGEST_SERIES_DEPTH + 1,)).fetchall())
+        with self.lock:
+            self.reset()
+            for h, rel, name, title, meta in rows:
+                writers = [v for k, v in get_facet_values(meta) if k == 'writers']
+                self._put_series(h, rel, title or name, writers, counts.get(h, 0))
+            self._merge()
+        logger.info(f"🔤 Suggest index built: {len(self.by_ref)} terms, "
+                    f"{sum(len(s) for s in self.segments.values())} keys")
+
+    def apply(self, series, counts):
+        with self.lock:
+            for h, rel, title, writers in series: self._put_series(h, rel, title, writers, counts.get(h, 0))
+            for h, c in counts.items():
+                tid = self.by_ref.get(('s', h))
+                if tid is not None: self._set_count(tid, c)
+            self._settle()
+
+    def remove(self, path_hashes):
+        with self.lock:
+            for h in path_hashes:
+                tid = self.by_ref.pop(('s', h), None)
+                if tid is None: continue
+                self._kill(tid)
+                for w in self.series_writers.pop(h, ()): self._add_writer(w, -1)
+            self._settle()
+
+    def touch(self, ref):
+        """조회 시 인기도를 올립니다. ref: ('s', path_hash) 또는 ('w', 작가명)"""
+        tid = self.by_ref.get(ref)
+        if tid is None: return
+        with self.lock:
+            self.hits[tid] += 1
+            self._set_count(tid, self.count[tid])
+
+    def _top(self, ids, limit, kind):
+        alive, kinds = self.alive, self.kind
+        cand = [t for t in ids if alive[t] and (kind is None or kinds[t] == kind)]
+        return heapq.nlargest(limit, cand, key=self.score.__getitem__)
+
+    def suggest(self, query, limit=10, kind=None):
+        q = ''.join(suggest_words(query))
+        if not q: return []
+        name = 'chosung' if all(ch in CHOSUNG for ch in q) else 'jamo'
+        key = q if name == 'chosung' else decompose_hangul(q)
+        with self.lock:
+            seg, delta = self.segments[name], self.delta[name]
+            lo, hi = seg.prefix_range(key)
+            ids = set(t for _, t in delta[bisect.bisect_left(delta, (key,)):bisect.bisect_left(delta, (key + '\uffff',))])
+            if hi - lo > SUGGEST_SCAN_MAX:
+                # 한두 글자 접두사: 세그먼트 쪽 상위 후보만 세대별로 캐시하고, alive/인기도는 아래에서 다시 확인합니다.
+                cached = self.wide_cache.get((name, key, limit, kind))
+                if cached is None or cached[0] != self.generation:
+                    if len(self.wide_cache) > 1024: self.wide_cache.clear()
+                    cached = self.wide_cache[(name, key, limit, kind)] = (self.generation, self._top(set(seg.ids[lo:hi]), limit * 2, kind))
+                ids.update(cached[1])
+            else:
+                ids.update(seg.ids[lo:hi])
+            return [{'text': self.text[t], 'kind': SUGGEST_KINDS[self.kind[t]], 'path': self.ref[t], 'count': self.count[t]}
+                    for t in self._top(ids, limit, kind)]
+
+
+suggest_index = SuggestIndex()
+
+
+def suggest_update(conn, items):
+    """save_entries 후 호출: 시리즈 폴더는 제목/작가를, 화(자식) 항목은 부모 시리즈의 화수를 갱신합니다."""
+    series = [(it[0], it[3], it[7] or it[4], [v for k, v in get_facet_values(it[10]) if k == 'writers'])
+              for it in items if it[5] == 1 and it[8] == SUGGEST_SERIES_DEPTH]
+    hashes = list(set(s[0] for s in series) | set(it[1] for it in items if it[8] == SUGGEST_SERIES_DEPTH + 1))
+    if not hashes: return
+    counts = {}
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        counts.update(conn.execute(f"SELECT parent_hash, COUNT(*) FROM entries WHERE parent_hash IN "
+                                   f"({','.join('?' * len(chunk))}) GROUP BY parent_hash", chunk).fetchall())
+    suggest_index.apply(series, counts)
+
+
+def build_suggest_index():
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    try:
+        suggest_index.build(conn)
+    finally:
+        conn.close()
+
+
+# --- JSON 직렬화 / 압축 ---
+def dumps_json(obj):
+    if HAS_ORJSON: return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def negotiate_encoding():
+    ae = request.headers.get('Accept-Encoding', '').lower()
+    if HAS_BROTLI and 'br' in ae: return 'br'
+    if 'gzip' in ae: return 'gzip'
+    return None
+
+
+def compress_bytes(data, encoding):
+    if encoding == 'br': return brotli.compress(data, quality=5)
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return z.compress(data) + z.flush()
+
+
+def compress_stream(chunks, encoding):
+    """청크 단위로 압축하며 흘려보냅니다. 각 청크마다 flush 하여 첫 바이트가 늦어지지 않게 합니다."""
+    if not encoding:
+        yield from chunks
+        return
+    if encoding == 'br':
+        c = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            out = c.process(chunk) + c.flush()
+            if out: yield out
+        yield c.finish()
+        return
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+        if out: yield out
+    yield z.flush()
+
+
+def stream_json_rows(sql, params, batch_fn, head=b'[', tail=b']'):
+    """DB 커서에서 STREAM_BATCH_SIZE 단위로 읽어 JSON 배열을 점진적으로 스트리밍합니다."""
+    def generate():
+        conn = sqlite3.connect(METADATA_DB_PATH); conn.row_factory = sqlite3.Row
         try:
-            conn.executemany('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', items)
-            conn.commit()
-        except Exception as e:
-            logger.error("DB Write Error: " + str(e))
+            cur = conn.execute(sql, params)
+            yield head
+            first = True
+            while True:
+                rows = cur.fetchmany(STREAM_BATCH_SIZE)
+                if not rows: break
+                body = b','.join(dumps_json(o) for o in batch_fn(conn, rows))
+                yield body if first else b',' + body
+                first = False
+            yield tail() if callable(tail) else tail
         finally:
-            db_queue.task_done()
-
+            conn.close()
 
-threading.Thread(target=db_writer_worker, daemon=True).start()
+    encoding = negotiate_encoding()
+    headers = {'Vary': 'Accept-Encoding'}
+    if encoding: headers['Content-Encoding'] = encoding
+    return Response(stream_with_context(compress_stream(generate(), encoding)), mimetype='application/json',
+                    headers=headers)
+
+
+@app.after_request
+def compress_json_response(resp):
+    """스트리밍이 아닌 JSON 응답을 Accept-Encoding에 따라 gzip/brotli로 압축합니다."""
+    if resp.is_streamed or resp.direct_passthrough or resp.mimetype != 'application/json': return resp
+    if 'Content-Encoding' in resp.headers or resp.status_code != 200: return resp
+    data = resp.get_data()
+    if len(data) < COMPRESS_MIN_BYTES: return resp
+    encoding = negotiate_encoding()
+    if not encoding: return resp
+    resp.set_data(compress_bytes(data, encoding))
+    resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
+
+
+# --- 응답 캐시 ---
+# 태그 종류: ('item', rel) 해당 항목, ('parent', rel) rel의 직계 자식, ('tree', rel) rel 하위 전체
+def get_cache_key():
+    return request.path, tuple(sorted(request.args.items(multi=True)))
+
+
+def get_cache_rel(abs_p):
+    rel = normalize_nfc(os.path.relpath(abs_p, BASE_PATH).replace(os.sep, '/')).strip('/')
+    return '' if rel == '.' else rel
+
+
+def cache_get(key):
+    """캐시된 응답을 반환합니다. 없으면 지금의 무효화 세대를 요청(g)에 기록해 두고 None. (조회보다 먼저 호출)"""
+    with response_cache_lock:
+        hit = response_cache.get(key)
+        if hit is None:
+            response_cache_stats["misses"] += 1
+            g.cache_generation = response_cache_generation
+            return None
+        response_cache.move_to_end(key)
+        response_cache_stats["hits"] += 1
+        return Response(hit[0], mimetype='application/json')
+
+
+def _cache_drop(key):
+    data, tags = response_cache.pop(key)
+    response_cache_stats["bytes"] -= len(data)
+    for t in tags:
+        keys = response_cache_tags.get(t)
+        if keys is not None:
+            keys.discard(key)
+            if not keys: del response_cache_tags[t]
+
+
+def cache_put(key, tags, data, generation):
+    """generation: 조회 전에 읽은 무효화 세대. 그 사이 무효화가 있었다면 오래된 결과이므로 저장하지 않습니다."""
+    if len(data) > RESPONSE_CACHE_MAX_BYTES // 8: return
+    with response_cache_lock:
+        if generation != response_cache_generation:
+            response_cache_stats["stale_skips"] += 1
+            return
+        if key in response_cache: _cache_drop(key)
+        response_cache[key] = (data, tags)
+        response_cache_stats["bytes"] += len(data)
+        for t in tags: response_cache_tags.setdefault(t, set()).add(key)
+        while response_cache_stats["bytes"] > RESPONSE_CACHE_MAX_BYTES:
+            _cache_drop(next(iter(response_cache)))
+            response_cache_stats["evictions"] += 1
+
+
+def cached_jsonify(key, tags, payload, cacheable=True):
+    """JSON으로 인코딩해 반환하면서 인코딩된 바이트를 캐시에 저장합니다."""
+    data = dumps_json(payload)
+    generation = g.pop('cache_generation', None)
+    if cacheable and generation is not None: cache_put(key, tags, data, generation)
+    return Response(data, mimetype='application/json')
+
+
+def cache_invalidate_items(items):
+    """저장된 entries 항목의 경로에 영향을 받는 캐시만 정확히 무효화합니다."""
+    tags = set()
+    for it in items:
+        rel = normalize_nfc(it[3]).strip('/')
+        parts = rel.split('/')
+        tags.add(('item', rel))
+        tags.add(('parent', '/'.join(parts[:-1])))
+        for i in range(len(parts) + 1): tags.add(('tree', '/'.join(parts[:i])))
+    global response_cache_generation
+    with response_cache_lock:
+        response_cache_generation += 1
+        for t in tags:
+            for key in list(response_cache_tags.get(t, ())):
+                _cache_drop(key)
+                response_cache_stats["invalidations"] += 1
+
+
+def cache_clear():
+    global response_cache_generation
+    with response_cache_lock:
+        response_cache_generation += 1
+        response_cache_stats["invalidations"] += len(response_cache)
+        response_cache.clear(); response_cache_tags.clear()
+        response_cache_stats["bytes"] = 0
 
 
 def init_db():
@@ -68,18 +634,573 @@ def init_db():
         conn.execute('CREATE INDEX IF NOT EXISTS idx_parent ON entries(parent_hash)')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_title ON entries(title)')
         conn.execute('CREATE INDEX IF NOT EXISTS idx_rel ON entries(rel_path)')
+        # 아카이브별 페이지 매니페스트 (정렬된 이미지 엔트리 + 오프셋/크기/해상도)
+        conn.execute('''CREATE TABLE IF NOT EXISTS manifests (
+            archive_hash TEXT PRIMARY KEY, abs_path TEXT, mtime REAL, size INTEGER,
+            page_count INTEGER, built_at REAL
+        )''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS manifest_pages (
+            archive_hash TEXT, idx INTEGER, entry TEXT, compress_type INTEGER,
+            data_offset INTEGER, compressed_size INTEGER, file_size INTEGER,
+            width INTEGER, height INTEGER,
+            PRIMARY KEY (archive_hash, idx)
+        )''')
+        # 포스터 URL별 저해상도 플레이스홀더 (data URI)
+        conn.execute('''CREATE TABLE IF NOT EXISTS placeholders (
+            poster_key TEXT PRIMARY KEY, poster_url TEXT, lqip TEXT, created REAL
+        )''')
+        # 패싯(작가/장르/태그/출판사/상태) 정규화 테이블과 다대다 연결
+        conn.execute('''CREATE TABLE IF NOT EXISTS facets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, value TEXT, UNIQUE (kind, value)
+        )''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS entry_facets (
+            facet_id INTEGER, path_hash TEXT, PRIMARY KEY (facet_id, path_hash)
+        ) WITHOUT ROWID''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_entry_facets_hash ON entry_facets(path_hash)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, path_hash TEXT, rel_path TEXT, op TEXT, changed REAL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_changes_hash ON changes(path_hash, seq)')
+        conn.execute('CREATE TABLE IF NOT EXISTS change_state (key TEXT PRIMARY KEY, value INTEGER)')
+        # 변경 로그 도입 전의 색인: 그 이전 상태는 로그에 없으므로 since=0 클라이언트는 전체 재동기화합니다.
+        if not conn.execute("SELECT 1 FROM change_state WHERE key = 'floor'").fetchone():
+            has_entries = conn.execute("SELECT 1 FROM entries LIMIT 1").fetchone()
+            conn.execute("INSERT INTO change_state VALUES ('floor', ?)", (1 if has_entries else 0,))
+        # 기존 DB 최초 이전: 패싯이 비어 있으면 entries 전체에서 한 번 채웁니다.
+        if not conn.execute("SELECT 1 FROM entry_facets LIMIT 1").fetchone():
+            rows = conn.execute("SELECT * FROM entries WHERE is_dir = 1").fetchall()
+            if rows:
+                logger.info(f"Building facet index for {len(rows)} entries...")
+                index_facets(conn, rows)
     conn.close()
 
 
 # --- 정보 추출 엔진 ---
 def is_comic_file(name):
-    return name.lower().endswith(('.zip', '.cbz', '.rar', '.cbr', '.pdf'))
+    return name.lower().endswith(('.zip', '.cbz', '.rar', '.cbr', '.7z', '.cb7', '.pdf'))
 
 
 def is_image_file(name):
     return name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.gif'))
 
 
+def is_zip_archive(name):
+    return name.lower().endswith(('.zip', '.cbz'))
+
+
+# --- 아카이브 백엔드 ---
+# 모든 백엔드는 list() / stat(name) / open(name) / read(name) / read_range(name, offset, length) / close()를 제공합니다.
+class ArchiveUnavailable(Exception):
+    """지원하지 않는 형식이거나, 필요한 라이브러리/외부 도구가 없어 아카이브를 열 수 없을 때"""
+
+
+class ZipArchive:
+    def __init__(self, path):
+        self.path = path
+        self.lease = archive_handles.acquire(path)
+        self.z = self.lease.z
+
+    def list(self):
+        return sorted([n for n in self.z.namelist() if is_image_file(n)])
+
+    def stat(self, name):
+        return self.z.getinfo(name).file_size
+
+    def open(self, name):
+        return self.z.open(name)
+
+    def read(self, name):
+        return self.z.read(name)
+
+    def read_range(self, name, offset, length):
+        with self.z.open(name) as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def close(self):
+        self.lease.release()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+
+class ExtractedArchive(abc.ABC):
+    """솔리드/비탐색 아카이브: 처음 열 때 페이지 캐시에 한 번 풀어두고, 이후에는 일반 파일로 읽습니다.
+    열려 있는 동안 풀어둔 폴더를 빌려 쓰므로(close()로 반납) 캐시 정리가 읽는 중인 폴더를 지우지 않습니다."""
+
+    def __init__(self, path):
+        self.path = path
+        self.key, self.dir = acquire_extracted(path, self.extract)
+        self._names = None
+
+    @abc.abstractmethod
+    def extract(self, dest):
+        """아카이브 전체를 dest 폴더에 풉니다."""
+
+    @classmethod
+    def read_first(cls, path):
+        """첫 이미지(이름순)의 바이트. 기본 구현은 전체를 풀어서 읽으며, 한 장만 꺼낼 수 있는 형식은 재정의합니다."""
+        with cls(path) as a:
+            imgs = a.list()
+            return a.read(imgs[0]) if imgs else None
+
+    def _file(self, name):
+        p = os.path.normpath(os.path.join(self.dir, name))
+        if not p.startswith(os.path.normpath(self.dir) + os.sep): raise KeyError(name)
+        return p
+
+    def list(self):
+        if self._names is None:
+            names = []
+            for root, _, files in os.walk(self.dir):
+                for f in files:
+                    if is_image_file(f): names.append(os.path.relpath(os.path.join(root, f), self.dir).replace(os.sep, '/'))
+            self._names = sorted(names)
+        return self._names
+
+    def stat(self, name):
+        return os.path.getsize(self._file(name))
+
+    def open(self, name):
+        return open(self._file(name), 'rb')
+
+    def read(self, name):
+        with self.open(name) as f: return f.read()
+
+    def read_range(self, name, offset, length):
+        with self.open(name) as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def close(self):
+        if self.key is None: return
+        release_extracted(self.key)
+        self.key = None
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+
+class RarArchive(ExtractedArchive):
+    @classmethod
+    def read_first(cls, path):
+        try:
+            import rarfile
+            with rarfile.RarFile(path) as rf:
+                imgs = sorted(n for n in rf.namelist() if is_image_file(n))
+                return rf.read(imgs[0]) if imgs else None
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"rarfile failed for {path}, trying external tools: {e}")
+        return run_read_tool(path, [('unrar', ['lb', '{src}'], ['p', '-inul', '{src}', '{name}']),
+                                    ('7z', ['l', '-ba', '-slt', '{src}'], ['e', '-so', '-bd', '{src}', '{name}']),
+                                    ('bsdtar', ['-tf', '{src}'], ['-xOf', '{src}', '{name}'])])
+
+    def extract(self, dest):
+        try:
+            import rarfile
+            with rarfile.RarFile(self.path) as rf: rf.extractall(dest)
+            return
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"rarfile failed for {self.path}, trying external tools: {e}")
+        run_extract_tool(self.path, dest, [('unrar', ['x', '-o+', '-inul', '{src}', '{dest}/']),
+                                           ('unar', ['-q', '-f', '-D', '-o', '{dest}', '{src}']),
+                                           ('7z', ['x', '-y', '-bd', '-o{dest}', '{src}']),
+                                           ('bsdtar', ['-xf', '{src}', '-C', '{dest}'])])
+
+
+class SevenZipArchive(ExtractedArchive):
+    @classmethod
+    def read_first(cls, path):
+        try:
+            import py7zr
+            with py7zr.SevenZipFile(path, 'r') as sz:
+                imgs = sorted(n for n in sz.getnames() if is_image_file(n))
+                if not imgs: return None
+                return sz.read([imgs[0]])[imgs[0]].read()
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"py7zr failed for {path}, trying external tools: {e}")
+        seven = (['l', '-ba', '-slt', '{src}'], ['e', '-so', '-bd', '{src}', '{name}'])
+        return run_read_tool(path, [('7z',) + seven, ('7zz',) + seven, ('7za',) + seven,
+                                    ('bsdtar', ['-tf', '{src}'], ['-xOf', '{src}', '{name}'])])
+
+    def extract(self, dest):
+        try:
+            import py7zr
+            with py7zr.SevenZipFile(self.path, 'r') as sz: sz.extractall(dest)
+            return
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"py7zr failed for {self.path}, trying external tools: {e}")
+        run_extract_tool(self.path, dest, [('7z', ['x', '-y', '-bd', '-o{dest}', '{src}']),
+                                           ('7zz', ['x', '-y', '-bd', '-o{dest}', '{src}']),
+                                           ('7za', ['x', '-y', '-bd', '-o{dest}', '{src}']),
+                                           ('bsdtar', ['-xf', '{src}', '-C', '{dest}'])])
+
+
+def run_tool(exe, args, timeout, stdout=subprocess.DEVNULL):
+    """외부 도구를 실행합니다. 실패하거나 시간을 넘기면 ArchiveUnavailable. (손상/암호 아카이브가 500이 되지 않도록)"""
+    try:
+        return subprocess.run([exe] + args, check=True, timeout=timeout, stdout=stdout, stderr=subprocess.PIPE).stdout
+    except subprocess.CalledProcessError as e:
+        err = (e.stderr or b'').decode('utf-8', 'replace').strip()
+        raise ArchiveUnavailable(f"{os.path.basename(exe)} failed (exit {e.returncode}): {err[:200]}") from e
+    except subprocess.TimeoutExpired as e:
+        raise ArchiveUnavailable(f"{os.path.basename(exe)} timed out after {timeout}s") from e
+
+
+def run_extract_tool(src, dest, candidates):
+    """설치된 첫 번째 외부 압축 해제 도구로 src를 dest에 풉니다. 하나도 없으면 ArchiveUnavailable."""
+    for tool, args in candidates:
+        exe = shutil.which(tool)
+        if not exe: continue
+        run_tool(exe, [a.format(src=src, dest=dest) for a in args], 600)
+        return
+    raise ArchiveUnavailable(f"No extractor for {os.path.basename(src)} (tried: {', '.join(t for t, _ in candidates)})")
+
+
+def run_read_tool(src, candidates):
+    """설치된 첫 번째 외부 도구로 목록을 읽고, 첫 이미지(이름순) 한 장만 표준 출력으로 꺼냅니다. 하나도 없으면 ArchiveUnavailable.
+    candidates: [(도구, 목록 인자, 꺼내기 인자)] ('7z l -slt'처럼 'Path = ' 줄이 있으면 그 줄만 이름으로 씁니다)"""
+    for tool, list_args, read_args in candidates:
+        exe = shutil.which(tool)
+        if not exe: continue
+        lines = run_tool(exe, [a.format(src=src) for a in list_args], 120, subprocess.PIPE).decode('utf-8', 'replace').splitlines()
+        names = [l[7:] for l in lines if l.startswith('Path = ')] or lines
+        imgs = sorted(n for n in names if is_image_file(n))
+        if not imgs: return None
+        return run_tool(exe, [a.format(src=src, name=imgs[0]) for a in read_args], 120, subprocess.PIPE)
+    raise ArchiveUnavailable(f"No reader for {os.path.basename(src)} (tried: {', '.join(c[0] for c in candidates)})")
+
+
+# 페이지 캐시 사용 현황: key -> {'lock': 해제 잠금, 'users': 빌려 쓰는 중인 수}. 아무도 쓰지 않는 항목은 바로 지웁니다.
+page_cache_entries = {}
+page_cache_lock = threading.Lock()
+
+
+def acquire_extracted(path, extract_fn):
+    """아카이브를 페이지 캐시에 풀어둔 폴더를 빌려 (key, 경로)를 반환합니다. 다 쓰면 release_extracted(key).
+    (경로+mtime+크기 기준, 동시 요청은 한 번만 해제)"""
+    st = os.stat(path)
+    key = hashlib.md5(f"{normalize_nfc(path)}|{st.st_mtime}|{st.st_size}".encode('utf-8')).hexdigest()
+    dest = os.path.join(PAGE_CACHE_DIR, key)
+    with page_cache_lock:
+        entry = page_cache_entries.setdefault(key, {'lock': threading.Lock(), 'users': 0})
+        entry['users'] += 1
+    try:
+        with entry['lock']:
+            if not os.path.isdir(dest):
+                os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+                tmp = dest + ".tmp"
+                shutil.rmtree(tmp, ignore_errors=True)
+                os.makedirs(tmp)
+                try:
+                    extract_fn(tmp)
+                except Exception:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    raise
+                size = sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(tmp) for f in fs)
+                with open(os.path.join(tmp, ".cache_size"), 'w') as f: f.write(str(size))
+                os.rename(tmp, dest)
+                evict_page_cache()
+        os.utime(dest)  # LRU: 마지막 사용 시각 갱신
+    except Exception:
+        release_extracted(key)
+        raise
+    return key, dest
+
+
+def release_extracted(key):
+    with page_cache_lock:
+        entry = page_cache_entries.get(key)
+        if entry is None: return
+        entry['users'] -= 1
+        if entry['users'] <= 0: del page_cache_entries[key]
+
+
+def remove_page_cache_dir(path):
+    """사용 중이 아닌 페이지 캐시 폴더를 지웁니다. 지웠으면 True.
+    빌려 쓰는 쪽과 같은 잠금 안에서 이름을 바꿔 떼어낸 뒤 지우므로, 그 사이 들어온 요청은 새로 풀게 됩니다."""
+    key = os.path.basename(path)
+    trash = f"{path}.{threading.get_ident()}.evict.tmp"
+    with page_cache_lock:
+        if key in page_cache_entries: return False
+        try: os.rename(path, trash)
+        except OSError: return False
+    shutil.rmtree(trash, ignore_errors=True)
+    return True
+
+
+def evict_page_cache():
+    """페이지 캐시가 PAGE_CACHE_MAX_BYTES를 넘으면 가장 오래 사용하지 않은 아카이브부터 지웁니다. (사용 중인 폴더는 건너뜀)"""
+    dirs = []
+    for e in os.scandir(PAGE_CACHE_DIR):
+        if not e.is_dir() or e.name.endswith(".tmp"): continue
+        try:
+            with open(os.path.join(e.path, ".cache_size")) as f: size = int(f.read() or 0)
+            dirs.append((e.stat().st_mtime, size, e.path))
+        except (OSError, ValueError):
+            continue
+    total = sum(d[1] for d in dirs)
+    for _, size, path in sorted(dirs):
+        if total <= PAGE_CACHE_MAX_BYTES: break
+        if remove_page_cache_dir(path): total -= size
+
+
+def archive_backend(path):
+    """매직 바이트(없으면 확장자)로 알맞은 아카이브 백엔드 클래스를 고릅니다. (.cbz로 이름만 바뀐 RAR도 처리)"""
+    with open(path, 'rb') as f: magic = f.read(6)
+    n = path.lower()
+    if magic.startswith(b'PK'): return ZipArchive
+    if magic.startswith(b'Rar!'): return RarArchive
+    if magic.startswith(b'7z\xbc\xaf\x27\x1c'): return SevenZipArchive
+    if n.endswith(('.zip', '.cbz')): return ZipArchive
+    if n.endswith(('.rar', '.cbr')): return RarArchive
+    if n.endswith(('.7z', '.cb7')): return SevenZipArchive
+    raise ArchiveUnavailable(f"Unsupported archive: {os.path.basename(path)}")
+
+
+def open_archive(path):
+    """알맞은 아카이브 백엔드를 엽니다. RAR/7z는 페이지 캐시에 전체를 풉니다."""
+    return archive_backend(path)(path)
+
+
+def read_first_image(path):
+    """아카이브의 첫 이미지(이름순)를 읽습니다. (포스터/플레이스홀더용)
+    RAR/7z도 그 한 장만 꺼내므로, 스캔 뒤의 플레이스홀더 생성이 페이지 캐시를 채우며 읽는 중인 페이지를 밀어내지 않습니다."""
+    backend = archive_backend(path)
+    if backend is ZipArchive:
+        with ZipArchive(path) as a:
+            imgs = a.list()
+            return a.read(imgs[0]) if imgs else None
+    return backend.read_first(path)
+
+
+def parse_image_size(head):
+    """이미지 헤더 바이트에서 (width, height)를 읽습니다. 전체 디코딩 없이 JPEG/PNG/GIF/WEBP 헤더만 해석합니다."""
+    if head[:8] == b'\x89PNG\r\n\x1a\n' and len(head) >= 24:
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            w, h = struct.unpack('<HH', head[26:30])
+            return w & 0x3fff, h & 0x3fff
+        if chunk == b'VP8L':
+            b = head[21:25]
+            return 1 + (((b[1] & 0x3F) << 8) | b[0]), 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(head[24:27], 'little'), 1 + int.from_bytes(head[27:30], 'little')
+    if head[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 < len(head):
+            if head[i] != 0xFF: i += 1; continue
+            marker = head[i + 1]
+            if marker == 0xFF: i += 1; continue
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7: i += 2; continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack('>HH', head[i + 5:i + 9])
+                return w, h
+            i += 2 + struct.unpack('>H', head[i + 2:i + 4])[0]
+    return None
+
+
+def read_image_size(f, limit=512 * 1024):
+    """파일 객체에서 헤더를 조금씩 읽으며 해상도를 찾습니다. (EXIF가 큰 JPEG 대비 최대 limit 바이트)"""
+    head = b''
+    while len(head) < limit:
+        chunk = f.read(16384 if not head else len(head))
+        if not chunk: break
+        head += chunk
+        size = parse_image_size(head)
+        if size: return size
+    return None, None
+
+
+def build_manifest(abs_path):
+    """아카이브의 페이지 매니페스트를 만들어 DB에 저장합니다. 변경이 없으면 건너뜁니다. (오프셋/압축 방식은 ZIP만)"""
+    abs_path = os.path.abspath(abs_path).replace(os.sep, '/')
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return None
+    a_hash = get_path_hash(abs_path)
+    conn = sqlite3.connect(METADATA_DB_PATH, timeout=20)
+    try:
+        row = conn.execute("SELECT mtime, size FROM manifests WHERE archive_hash = ?", (a_hash,)).fetchone()
+        if row and row[0] == st.st_mtime and row[1] == st.st_size: return a_hash
+        if REPLICA_MODE: return a_hash if row else None
+        pages = []
+        with open_archive(abs_path) as a:
+            if isinstance(a, ZipArchive):
+                with open(abs_path, 'rb') as raw:
+                    infos = sorted([i for i in a.z.infolist() if is_image_file(i.filename)], key=lambda i: i.filename)
+                    for idx, info in enumerate(infos):
+                        raw.seek(info.header_offset)
+                        lh = raw.read(30)
+                        name_len, extra_len = struct.unpack('<HH', lh[26:30])
+                        data_offset = info.header_offset + 30 + name_len + extra_len
+                        try:
+                            with a.z.open(info) as f: w, h = read_image_size(f)
+                        except Exception:
+                            w, h = None, None
+                        pages.append((a_hash, idx, info.filename, info.compress_type, data_offset,
+                                      info.compress_size, info.file_size, w, h))
+            else:
+                for idx, name in enumerate(a.list()):
+                    size = a.stat(name)
+                    try:
+                        with a.open(name) as f: w, h = read_image_size(f)
+                    except Exception:
+                        w, h = None, None
+                    pages.append((a_hash, idx, name, None, None, size, size, w, h))
+        db_write(save_manifest, a_hash, abs_path, st, pages)
+        return a_hash
+    except ArchiveUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Manifest Build Error in {abs_path}: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def save_manifest(conn, a_hash, abs_path, st, pages):
+    with conn:
+        conn.execute("DELETE FROM manifest_pages WHERE archive_hash = ?", (a_hash,))
+        conn.executemany('INSERT INTO manifest_pages VALUES (?,?,?,?,?,?,?,?,?)', pages)
+        conn.execute('INSERT OR REPLACE INTO manifests VALUES (?,?,?,?,?,?)',
+                     (a_hash, abs_path, st.st_mtime, st.st_size, len(pages), time.time()))
+
+
+def get_manifest(abs_path):
+    """저장된 매니페스트 페이지 목록을 반환합니다. 없거나 아카이브가 바뀌었으면 즉시 생성합니다.
+    아카이브를 열 도구가 없으면 ArchiveUnavailable을 그대로 올려 라우트가 501로 응답하게 합니다."""
+    abs_path = os.path.abspath(abs_path).replace(os.sep, '/')
+    a_hash = build_manifest(abs_path)
+    if not a_hash and REPLICA_MODE:
+        # 스냅샷에 없는 새 아카이브: DB에 쓰지 않고 목록만 바로 읽어 돌려줍니다.
+        try:
+            with open_archive(abs_path) as a:
+                return [{'entry': n, 'width': None, 'height': None, 'file_size': a.stat(n)} for n in a.list()]
+        except ArchiveUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Archive Listing Error in {abs_path}: {e}")
+            return []
+    if not a_hash: return []
+    conn = sqlite3.connect(METADATA_DB_PATH); conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT * FROM manifest_pages WHERE archive_hash = ? ORDER BY idx", (a_hash,)).fetchall()
+    conn.close()
+    return rows
+
+
+def read_poster_bytes(p):
+    """poster_url(외부 URL / zip_thumb:// / 상대 경로)이 가리키는 이미지 바이트를 읽습니다."""
+    p = urllib.parse.unquote(p or '')
+    if not p: return None
+    if p.startswith("http"):
+        req = urllib.request.Request(p, headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(req, timeout=10) as response: return response.read()
+    if p.startswith("zip_thumb://"):
+        azp = os.path.join(BASE_PATH, p[12:])
+        if os.path.isdir(azp):
+            with os.scandir(azp) as it:
+                for e in it:
+                    if is_comic_file(e.name): azp = e.path; break
+        return read_first_image(azp)
+    with open(os.path.join(BASE_PATH, p), 'rb') as f: return f.read()
+
+
+def get_placeholder_key(poster_url):
+    return hashlib.md5((poster_url or '').encode('utf-8')).hexdigest()
+
+
+def start_placeholder_pool():
+    global placeholder_proc_pool
+    with placeholder_lock:
+        if HAS_PIL and placeholder_proc_pool is None:
+            placeholder_proc_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+
+
+def build_placeholder_rows(poster_urls):
+    """포스터 한 묶음을 읽어 프로세스 풀에서 축소하고 저장할 행 목록을 반환합니다."""
+    futures, rows = {}, []
+    for url in poster_urls:
+        try:
+            data = read_poster_bytes(url)
+            if data: futures[url] = placeholder_proc_pool.submit(NasShared.make_lqip, data)
+            else: rows.append((get_placeholder_key(url), url, None, time.time()))
+        except Exception as e:
+            logger.error(f"Placeholder Read Error for {url}: {e}")
+            rows.append((get_placeholder_key(url), url, None, time.time()))  # 실패도 기록하여 재시도 반복을 막습니다.
+    for url, fut in futures.items():
+        try: rows.append((get_placeholder_key(url), url, fut.result(timeout=60), time.time()))
+        except Exception as e:
+            logger.error(f"Placeholder Build Error for {url}: {e}")
+            rows.append((get_placeholder_key(url), url, None, time.time()))
+    return rows
+
+
+def build_placeholders(poster_urls):
+    """포스터 목록의 플레이스홀더를 PLACEHOLDER_BATCH_SIZE개씩 생성하여 저장합니다.
+    카테고리 전체 같은 큰 목록도 한 묶음의 이미지만 메모리에 올립니다."""
+    try:
+        start_placeholder_pool()
+        for i in range(0, len(poster_urls), PLACEHOLDER_BATCH_SIZE):
+            batch = poster_urls[i:i + PLACEHOLDER_BATCH_SIZE]
+            rows = build_placeholder_rows(batch)
+            if rows: db_write(save_placeholders, rows)
+            with placeholder_lock:
+                placeholder_pending.difference_update(batch)
+    finally:
+        with placeholder_lock:
+            placeholder_pending.difference_update(poster_urls)
+
+
+def save_placeholders(conn, rows):
+    conn.executemany('INSERT OR REPLACE INTO placeholders VALUES (?,?,?,?)', rows)
+    conn.commit()
+
+
+def schedule_placeholders(poster_urls):
+    """아직 생성되지 않은 포스터의 플레이스홀더 생성을 백그라운드에 예약합니다."""
+    if not HAS_PIL or REPLICA_MODE: return
+    with placeholder_lock:
+        todo = [u for u in set(poster_urls) if u and u not in placeholder_pending]
+        placeholder_pending.update(todo)
+    if todo: placeholder_pool.submit(run_profiled, 'build_placeholders', build_placeholders, todo)
+
+
+def get_placeholders(conn, poster_urls):
+    """poster_url -> lqip 사전을 반환하고, 없는 항목은 지연 생성을 예약합니다."""
+    urls = list(set(u for u in poster_urls if u))
+    if not urls: return {}
+    keys = [get_placeholder_key(u) for u in urls]
+    found = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        for r in conn.execute(f"SELECT poster_url, lqip FROM placeholders WHERE poster_key IN ({','.join('?' * len(chunk))})",
+                              chunk):
+            found[r[0]] = r[1]
+    schedule_placeholders([u for u in urls if u not in found])
+    return found
+
+
+def placeholders_ready(placeholders, poster_urls):
+    """생성 대기 중인 플레이스홀더가 없으면 True. (대기 중인 응답은 캐시하지 않습니다)"""
+    return not HAS_PIL or all(u in placeholders for u in poster_urls if u)
+
+
 def get_comic_info(abs_path, rel_path):
     title = normalize_nfc(os.path.basename(abs_path))
     poster = None
@@ -172,6 +1293,7 @@ def get_comic_info(abs_path, rel_path):
 
 
 def scan_folder_sync(abs_path, recursive_depth=0):
+    if REPLICA_MODE: return []
     abs_path = os.path.abspath(abs_path).replace(os.sep, '/')
     root = os.path.abspath(BASE_PATH).replace(os.sep, '/')
     rel_from_root = os.path.relpath(abs_path, BASE_PATH).replace(os.sep, '/')
@@ -185,8 +1307,7 @@ def scan_folder_sync(abs_path, recursive_depth=0):
                        meta_json)
 
         conn = sqlite3.connect(METADATA_DB_PATH)
-        conn.execute('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', folder_item)
-        conn.commit()
+        save_entries(conn, [folder_item])
         conn.close()
 
     items = []
@@ -203,9 +1324,12 @@ def scan_folder_sync(abs_path, recursive_depth=0):
                                  poster, title, get_depth(rel), time.time(), meta_json))
         if items:
             conn = sqlite3.connect(METADATA_DB_PATH)
-            conn.executemany('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', items)
-            conn.commit()
+            save_entries(conn, items)
             conn.close()
+            for item in items:
+                if item[5] == 0 and is_zip_archive(item[2]):
+                    manifest_pool.submit(run_profiled, 'build_manifest', build_manifest, item[2])
+            schedule_placeholders([item[6] for item in items])
             if recursive_depth > 0:
                 for item in items:
                     if item[5] == 1: scan_folder_sync(item[2], recursive_depth - 1)
@@ -214,7 +1338,458 @@ def scan_folder_sync(abs_path, recursive_depth=0):
     return items
 
 
+# --- 파일시스템 감시 ---
+watcher_status = {"mode": "off", "watched": 0, "pending": 0, "events": 0, "reindexed": 0, "removed": 0}
+watcher_pending = {}  # abs_dir -> 마지막 이벤트 시각
+watcher_lock = threading.Lock()
+watcher_dir_mtimes = {}  # 폴링 모드: abs_dir -> st_mtime
+inotify = None
+inotify_wds = {}  # inotify 모드: wd -> abs_dir
+
+
+def is_network_mount(path):
+    """/proc/mounts 에서 path가 속한 마운트의 파일시스템이 네트워크(NFS/SMB 등)인지 확인합니다."""
+    try:
+        best, fstype = '', ''
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3: continue
+                mnt = parts[1].replace('\\040', ' ')
+                if (path == mnt or path.startswith(mnt.rstrip('/') + '/')) and len(mnt) > len(best):
+                    best, fstype = mnt, parts[2]
+        return fstype.startswith(('nfs', 'cifs', 'smb', 'fuse', '9p'))
+    except OSError:
+        return False
+
+
+def watcher_mark(abs_dir):
+    abs_dir = os.path.abspath(abs_dir).replace(os.sep, '/')
+    with watcher_lock:
+        watcher_pending[abs_dir] = time.time()
+        watcher_status["events"] += 1
+        watcher_status["pending"] = len(watcher_pending)
+
+
+def remove_stale_children(abs_dir, items):
+    """재색인 후 디스크에서 사라진 하위 항목(및 그 아래 전체)을 DB에서 제거합니다."""
+    current = set(it[0] for it in items)
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    try:
+        stale = [r for r in conn.execute("SELECT * FROM entries WHERE parent_hash = ?", (get_path_hash(abs_dir),))
+                 if r[0] not in current]
+        # 사라진 폴더의 하위 전체는 parent_hash 로 따라 내려갑니다. (이름이 비슷한 다른 폴더를 건드리지 않도록)
+        todo = [r[0] for r in stale if r[5] == 1]
+        while todo:
+            chunk, todo = todo[:500], todo[500:]
+            rows = conn.execute(f"SELECT * FROM entries WHERE parent_hash IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+            stale += rows
+            todo += [r[0] for r in rows if r[5] == 1]
+        delete_entries(conn, stale)
+        return len(stale)
+    finally:
+        conn.close()
+
+
+def reindex_dir(abs_dir):
+    """변경된 폴더 하나를 scan_folder_sync로 다시 색인합니다. 새로 생긴 하위 폴더는 이어서 색인합니다."""
+    if not os.path.isdir(abs_dir):
+        watcher_mark(os.path.dirname(abs_dir))
+        return
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    known = set(r[0] for r in conn.execute("SELECT path_hash FROM entries WHERE parent_hash = ?", (get_path_hash(abs_dir),)))
+    conn.close()
+    items = scan_folder_sync(abs_dir, 0)
+    try:
+        os.listdir(abs_dir)  # 목록 읽기 실패로 빈 결과가 나온 경우 삭제하지 않습니다.
+        watcher_status["removed"] += remove_stale_children(abs_dir, items)
+    except OSError:
+        pass
+    watcher_status["reindexed"] += 1
+    for it in items:
+        if it[5] == 1 and it[0] not in known:
+            # 새 폴더: 폴링 대상에 추가하고 내용도 색인합니다. (inotify는 CREATE 이벤트에서 이미 감시를 추가함)
+            if watcher_status["mode"] == "poll":
+                try: watcher_dir_mtimes[it[2]] = os.stat(it[2]).st_mtime
+                except OSError: continue
+            watcher_mark(it[2])
+
+
+def watcher_debounce_worker():
+    """이벤트가 WATCHER_DEBOUNCE_SEC 동안 잠잠해진 폴더만 골라 재색인을 예약합니다."""
+    while True:
+        time.sleep(1)
+        now = time.time()
+        with watcher_lock:
+            ready = [d for d, t in watcher_pending.items() if now - t >= WATCHER_DEBOUNCE_SEC]
+            for d in ready: del watcher_pending[d]
+            watcher_status["pending"] = len(watcher_pending)
+        for d in ready: scanning_pool.submit(run_profiled, 'reindex_dir', reindex_dir, d)
+
+
+def watcher_poll_worker():
+    """폴링 모드: 색인된 폴더들의 mtime만 stat 으로 비교합니다. (readdir 없이 항목 추가/삭제 감지)"""
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    dirs = [r[0] for r in conn.execute("SELECT abs_path FROM entries WHERE is_dir = 1")]
+    conn.close()
+    for d in dirs + [os.path.join(BASE_PATH, c).replace(os.sep, '/') for c in ALLOWED_CATEGORIES]:
+        try: watcher_dir_mtimes[d] = os.stat(d).st_mtime
+        except OSError: pass
+    watcher_status["watched"] = len(watcher_dir_mtimes)
+    while True:
+        time.sleep(WATCHER_POLL_INTERVAL)
+        for d, old in list(watcher_dir_mtimes.items()):
+            try: mtime = os.stat(d).st_mtime
+            except OSError:
+                watcher_dir_mtimes.pop(d, None)
+                watcher_mark(os.path.dirname(d))
+                continue
+            if mtime != old:
+                watcher_dir_mtimes[d] = mtime
+                watcher_mark(d)
+        watcher_status["watched"] = len(watcher_dir_mtimes)
+
+
+def inotify_add_tree(abs_dir):
+    mask = flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO | flags.CLOSE_WRITE | flags.DELETE_SELF
+    for root, dirs, _ in os.walk(abs_dir):
+        try: inotify_wds[inotify.add_watch(root, mask)] = root.replace(os.sep, '/')
+        except OSError as e: logger.warning(f"inotify watch failed for {root}: {e}")
+    watcher_status["watched"] = len(inotify_wds)
+
+
+def watcher_inotify_worker():
+    for c in ALLOWED_CATEGORIES: inotify_add_tree(os.path.join(BASE_PATH, c))
+    while True:
+        for ev in inotify.read(timeout=1000):
+            d = inotify_wds.get(ev.wd)
+            if d is None: continue
+            if ev.mask & flags.DELETE_SELF:
+                inotify_wds.pop(ev.wd, None)
+                continue
+            if ev.mask & flags.ISDIR and ev.mask & (flags.CREATE | flags.MOVED_TO):
+                inotify_add_tree(os.path.join(d, ev.name))
+            watcher_mark(d)
+
+
+def start_watcher():
+    global inotify, flags
+    mode = WATCHER_MODE
+    if mode in ('auto', 'inotify'):
+        try:
+            from inotify_simple import INotify, flags
+            if mode == 'auto' and is_network_mount(os.path.abspath(BASE_PATH)):
+                logger.info("BASE_PATH is on a network mount; using mtime polling watcher.")
+                mode = 'poll'
+            else:
+                inotify = INotify()
+                mode = 'inotify'
+        except ImportError:
+            logger.warning("inotify_simple not found. Falling back to mtime polling. Install with: pip install inotify_simple")
+            mode = 'poll'
+    watcher_status["mode"] = mode
+    threading.Thread(target=watcher_debounce_worker, daemon=True).start()
+    threading.Thread(target=watcher_inotify_worker if mode == 'inotify' else watcher_poll_worker, daemon=True).start()
+    logger.info(f"Filesystem watcher started ({mode})")
+
+
+# --- 인덱스 스냅샷 / 읽기 전용 복제 ---
+REPLICA_BLOCKED_ROUTES = ['/metadata/scan_stream', '/metadata/sync_single', '/metadata/delete_by_title',
+                          '/metadata/inject', '/metadata/snapshot/export']
+snapshot_lock = threading.Lock()
+replica_status = {"active_snapshot": None, "activated_at": None, "last_check": None, "last_error": None, "swaps": 0}
+
+
+def read_snapshot_info(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return dict(conn.execute("SELECT key, value FROM snapshot_info").fetchall())
+    finally:
+        conn.close()
+
+
+def list_snapshots():
+    """SNAPSHOT_DIR의 스냅샷 파일을 최신순으로 반환합니다. (파일명: index-<snapshot_id>.db)"""
+    if not os.path.isdir(SNAPSHOT_DIR): return []
+    names = [n for n in os.listdir(SNAPSHOT_DIR) if n.startswith("index-") and n.endswith(".db")]
+    return [os.path.join(SNAPSHOT_DIR, n) for n in sorted(names, key=lambda n: int(n[6:-3]), reverse=True)]
+
+
+def prune_snapshots(keep_path=None):
+    for path in list_snapshots()[SNAPSHOT_KEEP:]:
+        if path == keep_path or path == METADATA_DB_PATH: continue
+        for suffix in ('', '-wal', '-shm'):
+            try: os.remove(path + suffix)
+            except OSError: pass
+
+
+def export_snapshot():
+    """SQLite 백업 API로 색인(entries, 매니페스트, 플레이스홀더, 패싯 포함)의 일관된 스냅샷을 만듭니다.
+    백업은 한 번의 step으로 수행하므로 스캔이 진행 중이어도 한 시점의 상태가 복사됩니다. (WAL: 쓰기를 막지 않음)"""
+    with snapshot_lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        snapshot_id = int(time.time() * 1000)
+        path = os.path.join(SNAPSHOT_DIR, f"index-{snapshot_id}.db")
+        tmp = path + ".tmp"
+        src = sqlite3.connect(METADATA_DB_PATH, timeout=60)
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst, pages=-1)
+            dst.execute('PRAGMA journal_mode=DELETE')
+            dst.execute("CREATE TABLE IF NOT EXISTS snapshot_info (key TEXT PRIMARY KEY, value TEXT)")
+            info = {'snapshot_id': str(snapshot_id), 'created': str(time.time()), 'base_path': BASE_PATH,
+                    'entries': str(dst.execute("SELECT COUNT(*) FROM entries").fetchone()[0])}
+            dst.executemany("INSERT OR REPLACE INTO snapshot_info VALUES (?, ?)", list(info.items()))
+            dst.commit()
+        finally:
+            dst.close(); src.close()
+        os.replace(tmp, path)
+        prune_snapshots(keep_path=path)
+        logger.info(f"📦 Snapshot exported: {path} ({info['entries']} entries)")
+        return dict(info, file=os.path.basename(path), size=os.path.getsize(path))
+
+
+def verify_snapshot(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        if conn.execute("PRAGMA quick_check").fetchone()[0] != 'ok': return False
+        tables = set(r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        return {'entries', 'snapshot_info'} <= tables
+    finally:
+        conn.close()
+
+
+def check_snapshot_base(path):
+    """스냅샷을 만든 서버의 BASE_PATH가 이 서버와 같은지 확인합니다. 다르면 ValueError.
+    path_hash와 매니페스트 키가 BASE_PATH 아래 절대 경로로 만들어지므로, 다른 위치에 마운트한 복제 서버는
+    오류 없이 빈 목록만 내려주게 되고 복제 모드에서는 스캔도 하지 않아 스스로 복구되지 않습니다."""
+    recorded = read_snapshot_info(path).get('base_path')
+    norm = lambda p: normalize_nfc(os.path.abspath(p)).replace(os.sep, '/').rstrip('/')
+    if not recorded or norm(recorded) != norm(BASE_PATH):
+        raise ValueError(f"Snapshot {os.path.basename(path)} was built for BASE_PATH {recorded!r}, "
+                         f"but this replica uses {BASE_PATH!r}; mount the library at the same path")
+
+
+def activate_snapshot(path):
+    """읽기 전용 복제 서버가 사용할 DB 파일을 원자적으로 교체합니다. (BASE_PATH가 다른 스냅샷은 ValueError)
+    모든 코드가 요청마다 METADATA_DB_PATH로 새로 접속하므로, 진행 중인 요청은 이전 파일을 계속 읽고 새 요청부터 새 파일을 씁니다."""
+    global METADATA_DB_PATH
+    check_snapshot_base(path)
+    # 경로를 먼저 바꾼 뒤 세대를 올립니다. 세대를 올리기 전에 이전 파일을 읽은 요청은 저장을 건너뛰고,
+    # 올린 뒤 세대를 읽은 요청은 이미 새 파일에 접속하므로 이전 스냅샷의 결과가 캐시에 남지 않습니다.
+    METADATA_DB_PATH = path
+    cache_clear()
+    build_suggest_index()
+    replica_status.update(active_snapshot=os.path.basename(path), activated_at=time.time())
+    replica_status["swaps"] += 1
+    logger.info(f"🔁 Replica switched to snapshot {os.path.basename(path)}")
+
+
+def fetch_latest_snapshot():
+    """REPLICA_SOURCE에 지금보다 새로운 스냅샷이 있으면 SNAPSHOT_DIR로 받아오고 경로를 반환합니다."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    current = replica_status["active_snapshot"]
+    current_id = int(current[6:-3]) if current else 0
+    if REPLICA_SOURCE.startswith("http"):
+        with urllib.request.urlopen(REPLICA_SOURCE.rstrip('/') + "/metadata/snapshot/info", timeout=30) as r:
+            info = json.loads(r.read())
+        snapshot_id = int(info['snapshot_id'])
+        if snapshot_id <= current_id: return None
+        path = os.path.join(SNAPSHOT_DIR, f"index-{snapshot_id}.db")
+        with urllib.request.urlopen(REPLICA_SOURCE.rstrip('/') + f"/metadata/snapshot/download?id={snapshot_id}",
+                                    timeout=600) as r, open(path + ".tmp", 'wb') as f:
+            shutil.copyfileobj(r, f, 1024 * 1024)
+    else:
+        names = [n for n in os.listdir(REPLICA_SOURCE) if n.startswith("index-") and n.endswith(".db")]
+        if not names: return None
+        name = max(names, key=lambda n: int(n[6:-3]))
+        if int(name[6:-3]) <= current_id: return None
+        path = os.path.join(SNAPSHOT_DIR, name)
+        shutil.copyfile(os.path.join(REPLICA_SOURCE, name), path + ".tmp")
+    if not verify_snapshot(path + ".tmp"):
+        os.remove(path + ".tmp")
+        raise ValueError(f"Snapshot failed verification: {os.path.basename(path)}")
+    try:
+        check_snapshot_base(path + ".tmp")
+    except ValueError:
+        os.remove(path + ".tmp")
+        raise
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def replica_sync_worker():
+    while True:
+        replica_status["last_check"] = time.time()
+        try:
+            path = fetch_latest_snapshot()
+            if path:
+                activate_snapshot(path)
+                prune_snapshots(keep_path=path)
+            replica_status["last_error"] = None
+        except Exception as e:
+            replica_status["last_error"] = str(e)
+            logger.error(f"Replica Sync Error: {e}")
+        time.sleep(REPLICA_POLL_INTERVAL)
+
+
+def snapshot_export_worker():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        try: export_snapshot()
+        except Exception as e: logger.error(f"Snapshot Export Error: {e}")
+
+
+def start_replica():
+    """보관된 최신 스냅샷으로 바로 서비스를 시작하고, 원본에서 새 스냅샷을 주기적으로 받아옵니다."""
+    local = list_snapshots()
+    if not local: logger.warning("No local snapshot yet; waiting for the first one from REPLICA_SOURCE.")
+    try:
+        if local: activate_snapshot(local[0])
+    except ValueError as e:
+        replica_status["last_error"] = str(e)
+        logger.error(f"Replica Snapshot Rejected: {e}")
+    threading.Thread(target=replica_sync_worker, daemon=True).start()
+
+
+@app.before_request
+def replica_guard():
+    if REPLICA_MODE and request.path in REPLICA_BLOCKED_ROUTES:
+        return jsonify({"status": "error", "error": "Read-only replica"}), 403
+    return None
+
+
+@app.route('/metadata/snapshot/export')
+def snapshot_export():
+    try:
+        return jsonify(export_snapshot())
+    except Exception as e:
+        logger.error(f"Snapshot Export Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/metadata/snapshot/info')
+def snapshot_info():
+    snaps = list_snapshots()
+    if REPLICA_MODE and replica_status["active_snapshot"]: snaps = [METADATA_DB_PATH]
+    if not snaps: return jsonify({"error": "No snapshot", "replica": REPLICA_MODE}), 404
+    info = read_snapshot_info(snaps[0])
+    return jsonify(dict(info, file=os.path.basename(snaps[0]), size=os.path.getsize(snaps[0]), replica=REPLICA_MODE,
+                        replica_status=replica_status if REPLICA_MODE else None))
+
+
+@app.route('/metadata/snapshot/download')
+def snapshot_download():
+    snapshot_id = request.args.get('id', type=int)
+    snaps = list_snapshots()
+    if snapshot_id: snaps = [p for p in snaps if os.path.basename(p) == f"index-{snapshot_id}.db"]
+    if not snaps: return "Snapshot Not Found", 404
+    return send_file(snaps[0], mimetype='application/vnd.sqlite3', as_attachment=True,
+                     download_name=os.path.basename(snaps[0]))
+
+
+# --- 샘플링 프로파일러 (선택) ---
+# 활성화 시 모든 요청/작업의 스택을 PROFILE_INTERVAL 간격으로 샘플링하고,
+# PROFILE_SAMPLE_RATE 확률로 뽑힌 요청과 PROFILE_SLOW_MS 보다 느린 요청만 보관합니다. (구현: NasShared.Profiler)
+PROFILE_ENABLED = False
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_SLOW_MS = 1000
+PROFILE_INTERVAL = 0.005
+PROFILE_MAX_CAPTURES = 200
+
+profiler = NasShared.Profiler(logger, PROFILE_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, PROFILE_INTERVAL,
+                              PROFILE_MAX_CAPTURES)
+
+
+def run_profiled(name, fn, *args, **kwargs):
+    """백그라운드 작업(스캔 등)을 요청과 같은 방식으로 프로파일링하며 실행합니다."""
+    return profiler.run(name, fn, *args, **kwargs)
+
+
+@app.before_request
+def profile_before_request():
+    g.profile = profiler.start('request', request.path, request.args.to_dict(flat=False))
+
+
+@app.teardown_request
+def profile_teardown_request(exc):
+    profiler.stop(g.pop('profile', None))
+
+
+@app.route('/metadata/profiles')
+def list_profiles():
+    return jsonify(profiler.info())
+
+
+@app.route('/metadata/profiles/<int:pid>')
+def download_profile(pid):
+    """캡처 하나를 flamegraph.pl / speedscope 에서 읽을 수 있는 collapsed-stack 텍스트로 내려줍니다."""
+    body = profiler.folded(pid)
+    if body is None: return "Profile Not Found", 404
+    return Response(body, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename=profile_{pid}.folded'})
+
+
+# --- 부하 제어 (Admission Control) ---
+# 요청을 등급별로 나눠 동시 실행 수와 대기열 길이를 제한합니다. 우선순위: page > thumbnail > metadata > scan
+# 전체 동시 실행 수(ADMISSION_TOTAL_LIMIT)가 찼을 때는 우선순위가 높은 등급의 대기 요청부터 들어갑니다.
+ADMISSION_ENABLED = True
+ADMISSION_TOTAL_LIMIT = 24
+ADMISSION_RETRY_AFTER = 2
+ADMISSION_PRIORITY = ['page', 'thumbnail', 'metadata', 'scan']
+ADMISSION_CLASSES = {
+    'page': {'limit': 16, 'queue': 64, 'timeout': 10},
+    'thumbnail': {'limit': 8, 'queue': 32, 'timeout': 3},
+    'metadata': {'limit': 8, 'queue': 32, 'timeout': 5},
+    'scan': {'limit': 2, 'queue': 4, 'timeout': 1},
+}
+ROUTE_CLASSES = {
+    '/download_zip_entry': 'page', '/zip_bundle': 'page', '/zip_entries': 'page',
+    '/download': 'thumbnail',
+    '/scan': 'metadata', '/search': 'metadata', '/metadata': 'metadata', '/files': 'metadata',
+    '/facets': 'metadata', '/browse': 'metadata', '/changes': 'metadata',
+    '/metadata/scan_stream': 'scan', '/metadata/sync_single': 'scan', '/metadata/admin': 'scan',
+    '/metadata/delete_by_title': 'scan', '/metadata/inject': 'scan', '/monitor': 'scan',
+    '/metadata/debug_all': 'scan', '/check_zombie': 'scan',
+    '/metadata/snapshot/export': 'scan', '/metadata/snapshot/download': 'scan',
+}
+
+admission = NasShared.AdmissionControl(ADMISSION_CLASSES, ADMISSION_PRIORITY, ADMISSION_TOTAL_LIMIT)
+
+
+def admission_degraded_response(cls):
+    """썸네일 등급이 포화되면 원본 대신 저장된 저해상도 플레이스홀더(LQIP)를 바로 돌려줍니다."""
+    if cls != 'thumbnail': return None
+    poster_url = request.args.get('path', '')
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    row = conn.execute("SELECT lqip FROM placeholders WHERE poster_key = ?", (get_placeholder_key(poster_url),)).fetchone()
+    conn.close()
+    if not row or not row[0]: return None
+    return Response(base64.b64decode(row[0].split(',', 1)[1]), mimetype='image/jpeg',
+                    headers={'Cache-Control': 'no-store', 'X-Degraded': '1'})
+
+
+@app.before_request
+def admission_before_request():
+    return admission.before_request(ROUTE_CLASSES, admission_degraded_response, ADMISSION_RETRY_AFTER, ADMISSION_ENABLED)
+
+
+@app.teardown_request
+def admission_teardown_request(exc):
+    admission.teardown_request()
+
+
+@app.route('/metadata/admission')
+def admission_info():
+    return jsonify(dict(admission.info(), enabled=ADMISSION_ENABLED))
+
+
 # --- API ---
+@app.route('/metadata/watcher')
+def watcher_info():
+    return jsonify(dict(watcher_status, debounce_sec=WATCHER_DEBOUNCE_SEC, poll_interval=WATCHER_POLL_INTERVAL))
+
+
 @app.route('/metadata/admin')
 def metadata_admin():
     target_path = request.args.get('path', '완결A')
@@ -320,10 +1895,10 @@ def delete_by_title():
     title = request.args.get('title', '')
     if not title: return jsonify({"count": 0})
     conn = sqlite3.connect(METADATA_DB_PATH)
-    cursor = conn.execute("DELETE FROM entries WHERE title LIKE ? OR name LIKE ?", (f'%{title}%', f'%{title}%'))
-    count = cursor.rowcount
-    conn.commit(); conn.close()
-    return jsonify({"count": count})
+    rows = conn.execute("SELECT * FROM entries WHERE title LIKE ? OR name LIKE ?", (f'%{title}%', f'%{title}%')).fetchall()
+    delete_entries(conn, rows)
+    conn.close()
+    return jsonify({"count": len(rows)})
 
 
 @app.route('/download')
@@ -342,18 +1917,9 @@ def download():
             return "Image Proxy Error", 500
 
     if p.startswith("zip_thumb://"):
-        azp = os.path.join(BASE_PATH, p[12:])
-        if os.path.isdir(azp):
-            try:
-                with os.scandir(azp) as it:
-                    for e in it:
-                        if is_comic_file(e.name): azp = e.path; break
-            except: pass
         try:
-            with zipfile.ZipFile(azp, 'r') as z:
-                imgs = sorted([n for n in z.namelist() if is_image_file(n)])
-                if imgs:
-                    with z.open(imgs[0]) as f: return send_file(io.BytesIO(f.read()), mimetype='image/jpeg')
+            data = read_poster_bytes(p)
+            if data: return send_file(io.BytesIO(data), mimetype='image/jpeg')
         except: pass
         return "No Image", 404
     target_path = os.path.join(BASE_PATH, p)
@@ -395,15 +1961,17 @@ def list_files():
     abs_p = os.path.abspath(os.path.join(BASE_PATH, path)).replace(os.sep, '/')
     parent_hash = get_path_hash(abs_p)
     conn = sqlite3.connect(METADATA_DB_PATH)
-    conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT * FROM entries WHERE parent_hash = ? ORDER BY name", (parent_hash,)).fetchall()
+    exists = conn.execute("SELECT 1 FROM entries WHERE parent_hash = ? LIMIT 1", (parent_hash,)).fetchone()
     conn.close()
-    if not rows: scan_folder_sync(abs_p, 0); return list_files()
-    return jsonify([{'name': r['name'], 'isDirectory': bool(r['is_dir']), 'path': r['rel_path']} for r in rows])
+    if not exists and not REPLICA_MODE: scan_folder_sync(abs_p, 0); return list_files()
+    return stream_json_rows("SELECT name, is_dir, rel_path FROM entries WHERE parent_hash = ? ORDER BY name", (parent_hash,),
+                            lambda conn, rows: [{'name': r['name'], 'isDirectory': bool(r['is_dir']), 'path': r['rel_path']}
+                                                for r in rows])
 
 
 @app.route('/scan')
-def scan_comics():
+def scan_comics(rescanned=False):
+    """rescanned: 색인에 없어 한 번 스캔한 뒤의 재호출. 스캔해도 결과가 없으면 다시 스캔하지 않고 빈 목록을 돌려줍니다."""
     path = request.args.get('path', '')
     page = request.args.get('page', 1, type=int);
     psize = request.args.get('page_size', 50, type=int)
@@ -411,26 +1979,36 @@ def scan_comics():
     rel_path = os.path.relpath(abs_p, BASE_PATH).replace(os.sep, '/')
     cat_name = rel_path.split('/')[0]
     is_flatten_cat = any(normalize_nfc(f).lower() == normalize_nfc(cat_name).lower() for f in FLATTEN_CATEGORIES)
+    cache_key = get_cache_key()
+    cached = cache_get(cache_key)
+    if cached: return cached
     conn = sqlite3.connect(METADATA_DB_PATH);
     conn.row_factory = sqlite3.Row
     if is_flatten_cat and get_depth(rel_path) == 1:
-        rows = conn.execute("SELECT * FROM entries WHERE rel_path LIKE ? AND depth = 3 ORDER BY title LIMIT ? OFFSET ?",
-                            (path + '/%' if path else '%', psize, (page - 1) * psize)).fetchall()
-        if not rows and page == 1: conn.close(); scan_folder_sync(abs_p, 1); return scan_comics()
+        where, params = subtree_clause(path) if path else ("1 = 1", [])
+        rows = conn.execute(f"SELECT * FROM entries WHERE {where} AND depth = 3 ORDER BY title LIMIT ? OFFSET ?",
+                            params + [psize, (page - 1) * psize]).fetchall()
+        if not rows and page == 1 and not REPLICA_MODE and not rescanned:
+            conn.close(); scan_folder_sync(abs_p, 1); return scan_comics(rescanned=True)
     else:
         parent_hash = get_path_hash(abs_p)
         rows = conn.execute("SELECT * FROM entries WHERE parent_hash = ? ORDER BY name LIMIT ? OFFSET ?",
                             (parent_hash, psize, (page - 1) * psize)).fetchall()
-        if not rows and page == 1: conn.close(); scan_folder_sync(abs_p, 0); return scan_comics()
+        if not rows and page == 1 and not REPLICA_MODE and not rescanned:
+            conn.close(); scan_folder_sync(abs_p, 0); return scan_comics(rescanned=True)
     items = []
+    placeholders = get_placeholders(conn, [r['poster_url'] for r in rows])
     for r in rows:
         meta = json.loads(r['metadata'] or '{}')
         meta['poster_url'] = r['poster_url']
+        meta['placeholder'] = placeholders.get(r['poster_url'])
         meta['title'] = r['title']
         items.append({'name': r['title'] or r['name'], 'isDirectory': bool(r['is_dir']), 'path': r['rel_path'],
                       'metadata': meta})
     conn.close()
-    return jsonify({'total_items': 10000, 'page': page, 'page_size': psize, 'items': items})
+    tags = [('tree' if is_flatten_cat and get_depth(rel_path) == 1 else 'parent', get_cache_rel(abs_p))]
+    return cached_jsonify(cache_key, tags, {'total_items': 10000, 'page': page, 'page_size': psize, 'items': items},
+                          placeholders_ready(placeholders, [r['poster_url'] for r in rows]))
 
 
 @app.route('/search')
@@ -442,6 +2020,10 @@ def search_comics():
     page = request.args.get('page', 1, type=int)
     psize = request.args.get('page_size', 50, type=int)
 
+    cache_key = get_cache_key()
+    cached = cache_get(cache_key)
+    if cached: return cached
+
     logger.info(f"🔎 SEARCH START: '{query}'")
 
     conn = sqlite3.connect(METADATA_DB_PATH)
@@ -492,12 +2074,14 @@ def search_comics():
         total = total_row[0] if total_row else 0
 
         items = []
+        placeholders = get_placeholders(conn, [r['poster_url'] for r in rows])
         for r in rows:
             rel_path = r['rel_path']
             category = rel_path.split('/')[0] if rel_path else "Unknown"
 
             meta = json.loads(r['metadata'] or '{}')
             meta['poster_url'] = r['poster_url']
+            meta['placeholder'] = placeholders.get(r['poster_url'])
             meta['title'] = r['title']
             meta['category'] = category
 
@@ -509,7 +2093,9 @@ def search_comics():
             })
 
         logger.info(f"✅ SEARCH FINISH: Found {total} groups")
-        return jsonify({'total_items': total, 'page': page, 'page_size': psize, 'items': items})
+        return cached_jsonify(cache_key, [('tree', '')],
+                              {'total_items': total, 'page': page, 'page_size': psize, 'items': items},
+                              placeholders_ready(placeholders, [r['poster_url'] for r in rows]))
     except Exception as e:
         logger.error(f"❌ SEARCH ERROR: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -530,21 +2116,215 @@ def get_metadata():
     path = normalize_nfc(path);
     abs_p = os.path.abspath(os.path.join(BASE_PATH, path)).replace(os.sep, '/')
     phash = get_path_hash(abs_p);
+    suggest_index.touch(('s', phash))
+    cache_key = get_cache_key()
+    cached = cache_get(cache_key)
+    if cached: return cached
     conn = sqlite3.connect(METADATA_DB_PATH);
     conn.row_factory = sqlite3.Row
     row = conn.execute("SELECT * FROM entries WHERE path_hash = ?", (phash,)).fetchone()
     if not row: scan_folder_sync(os.path.dirname(abs_p), 0); row = conn.execute(
         "SELECT * FROM entries WHERE path_hash = ?", (phash,)).fetchone()
     if not row: conn.close(); return jsonify({"error": "Not found", "path": path}), 404
-    children = conn.execute("SELECT * FROM entries WHERE parent_hash = ? ORDER BY name", (phash,)).fetchall()
-    conn.close()
+    # chapter_page / chapter_page_size 로 챕터를 나눠 받을 수 있습니다. (생략 시 전체)
+    c_page = request.args.get('chapter_page', 0, type=int)
+    c_psize = request.args.get('chapter_page_size', 100, type=int)
+    c_total = conn.execute("SELECT COUNT(*) FROM entries WHERE parent_hash = ?", (phash,)).fetchone()[0]
+    c_sql = "SELECT * FROM entries WHERE parent_hash = ? ORDER BY name"
+    c_params = [phash]
+    if c_page > 0:
+        c_sql += " LIMIT ? OFFSET ?"
+        c_params += [c_psize, (c_page - 1) * c_psize]
+
+    def to_chapters(conn, rows, placeholders=None):
+        if placeholders is None: placeholders = get_placeholders(conn, [c['poster_url'] for c in rows])
+        return [{'name': c['name'], 'path': c['rel_path'], 'isDirectory': bool(c['is_dir']),
+                 'metadata': {'poster_url': c['poster_url'], 'placeholder': placeholders.get(c['poster_url']),
+                              'title': c['name']}} for c in rows]
+
     meta = json.loads(row['metadata'] or '{}');
     meta['title'] = row['title'];
     meta['poster_url'] = row['poster_url'];
     meta['rel_path'] = row['rel_path']
-    meta['chapters'] = [{'name': c['name'], 'path': c['rel_path'], 'isDirectory': bool(c['is_dir']),
-                         'metadata': {'poster_url': c['poster_url'], 'title': c['name']}} for c in children]
-    return jsonify(meta)
+    meta['chapters_total'] = c_total
+    if c_page <= 0 and c_total > METADATA_STREAM_THRESHOLD:
+        # 대형 시리즈: 전체를 메모리에 올리지 않고 커서에서 바로 스트리밍 (캐시하지 않음)
+        meta['placeholder'] = get_placeholders(conn, [row['poster_url']]).get(row['poster_url'])
+        conn.close()
+        head = dumps_json(meta)[:-1] + b',"chapters":['
+        return stream_json_rows(c_sql, c_params, to_chapters, head=head, tail=b']}')
+    children = conn.execute(c_sql, c_params).fetchall()
+    placeholders = get_placeholders(conn, [row['poster_url']] + [c['poster_url'] for c in children])
+    conn.close()
+    meta['placeholder'] = placeholders.get(row['poster_url'])
+    meta['chapters'] = to_chapters(None, children, placeholders)
+    rel = get_cache_rel(abs_p)
+    return cached_jsonify(cache_key, [('item', rel), ('parent', rel)], meta,
+                          placeholders_ready(placeholders, [row['poster_url']] + [c['poster_url'] for c in children]))
+
+
+def build_facet_filter(args):
+    """요청 인자(writers=, genres=, tags=, publisher=, status=, category=)로 entries 필터 SQL을 만듭니다."""
+    clauses, params = ["e.is_dir = 1"], []
+    cat = args.get('category')
+    if cat:
+        clause, cat_params = subtree_clause(cat, 'e.rel_path')
+        clauses.append(clause); params += cat_params
+    for kind in FACET_KINDS:
+        for value in args.getlist(kind):
+            clauses.append("e.path_hash IN (SELECT ef.path_hash FROM entry_facets ef JOIN facets f ON f.id = ef.facet_id "
+                           "WHERE f.kind = ? AND f.value = ?)")
+            params += [kind, normalize_nfc(value).strip()]
+    return " AND ".join(clauses), params
+
+
+@app.route('/facets')
+def list_facets():
+    """패싯 값 목록과 (현재 필터 기준) 시리즈 수를 반환합니다. 예: /facets?kind=genres&status=완결"""
+    kind = request.args.get('kind', 'writers')
+    if kind not in FACET_KINDS: return jsonify({'error': f"Unknown facet kind: {kind}", 'kinds': FACET_KINDS}), 400
+    limit = request.args.get('limit', 200, type=int)
+    where_stmt, params = build_facet_filter(request.args)
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    rows = conn.execute(f"""
+        SELECT f.value, COUNT(*) AS cnt FROM facets f
+        JOIN entry_facets ef ON ef.facet_id = f.id
+        JOIN entries e ON e.path_hash = ef.path_hash
+        WHERE f.kind = ? AND {where_stmt}
+        GROUP BY f.id ORDER BY cnt DESC, f.value LIMIT ?
+    """, [kind] + params + [limit]).fetchall()
+    conn.close()
+    return jsonify({'kind': kind, 'values': [{'value': r[0], 'count': r[1]} for r in rows]})
+
+
+def get_change_floor(conn):
+    row = conn.execute("SELECT value FROM change_state WHERE key = 'floor'").fetchone()
+    return row[0] if row else 0
+
+
+def compact_changes():
+    """같은 경로의 이전 변경 기록을 지우고(최신 것만 유지), 보존 기간이 지난 삭제 기록을 정리합니다.
+    정리된 삭제 기록의 최대 seq가 floor가 되며, floor보다 오래된 커서는 전체 재동기화가 필요합니다."""
+    db_write(compact_change_log)
+
+
+def compact_change_log(conn):
+    superseded = conn.execute("DELETE FROM changes WHERE seq NOT IN "
+                              "(SELECT MAX(seq) FROM changes GROUP BY path_hash)").rowcount
+    expired = conn.execute("SELECT MAX(seq) FROM changes WHERE op = 'd' AND changed < ?",
+                           (time.time() - CHANGES_RETENTION_SEC,)).fetchone()[0]
+    if expired:
+        conn.execute("DELETE FROM changes WHERE op = 'd' AND seq <= ?", (expired,))
+        conn.execute("UPDATE change_state SET value = MAX(value, ?) WHERE key = 'floor'", (expired,))
+    conn.commit()
+    if superseded or expired: logger.info(f"🧹 Change log compacted: {superseded} superseded, floor={get_change_floor(conn)}")
+
+
+def change_compact_worker():
+    while True:
+        time.sleep(CHANGES_COMPACT_INTERVAL)
+        try: compact_changes()
+        except Exception as e: logger.error(f"Change Compaction Error: {e}")
+
+
+@app.route('/changes')
+def list_changes():
+    """since 이후의 색인 변경을 seq 순으로 스트리밍합니다. 예: /changes?since=1234
+    경로마다 최신 변경만 전달합니다. (op: i=추가, u=수정, d=삭제)
+    응답의 next를 다음 since로 쓰고, more가 false가 될 때까지 반복합니다.
+    reset이 true면 커서가 정리된 기록보다 오래되었으므로, latest를 기억해 둔 뒤 /scan으로 전체를 다시 받고 since=latest부터 이어갑니다."""
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', CHANGES_PAGE_SIZE, type=int), CHANGES_PAGE_SIZE))
+    conn = sqlite3.connect(METADATA_DB_PATH)
+    floor = get_change_floor(conn)
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+    latest = row[0] if row else 0
+    conn.close()
+    if since < floor:
+        return jsonify({'since': since, 'floor': floor, 'latest': latest, 'reset': True, 'more': False,
+                        'next': latest, 'changes': []})
+
+    state = {'last': since, 'count': 0}
+
+    def to_changes(conn, rows):
+        placeholders = get_placeholders(conn, [r['poster_url'] for r in rows if r['poster_url']])
+        out = []
+        for r in rows:
+            if r['op'] == 'd' or r['path_hash'] is None:
+                out.append({'seq': r['seq'], 'op': 'd', 'path': r['change_path']})
+                continue
+            meta = json.loads(r['metadata'] or '{}')
+            meta['poster_url'] = r['poster_url']
+            meta['placeholder'] = placeholders.get(r['poster_url'])
+            meta['title'] = r['title']
+            meta['category'] = r['rel_path'].split('/')[0] if r['rel_path'] else "Unknown"
+            out.append({'seq': r['seq'], 'op': r['op'], 'path': r['rel_path'], 'parent': os.path.dirname(r['rel_path']),
+                        'name': r['title'] or r['name'], 'isDirectory': bool(r['is_dir']), 'metadata': meta})
+        state['last'] = rows[-1]['seq']
+        state['count'] += len(rows)
+        return out
+
+    def tail():
+        more = state['count'] >= limit and state['last'] < latest
+        return b'],' + dumps_json({'next': state['last'], 'more': more})[1:]
+
+    sql = """SELECT c.seq, c.op, c.rel_path AS change_path, e.* FROM changes c
+               LEFT JOIN entries e ON e.path_hash = c.path_hash
+               WHERE c.seq > ? AND c.seq = (SELECT MAX(seq) FROM changes WHERE path_hash = c.path_hash)
+               ORDER BY c.seq LIMIT ?"""
+    head = dumps_json({'since': since, 'floor': floor, 'latest': latest, 'reset': False})[:-1] + b',"changes":['
+    return stream_json_rows(sql, [since, limit], to_changes, head=head, tail=tail)
+
+
+@app.route('/suggest')
+def suggest():
+    """시리즈 제목/작가 자동완성. 접두사, 입력 중인 음절('날' -> '나루토'), 초성('ㄴㄹㅌ') 검색을 지원합니다.
+    예: /suggest?q=ㄴㄹ&limit=10&kind=series"""
+    q = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    kind = request.args.get('kind')
+    t0 = time.perf_counter()
+    items = suggest_index.suggest(q, limit, SUGGEST_KINDS.index(kind) if kind in SUGGEST_KINDS else None)
+    return jsonify({'query': q, 'items': items, 'took_ms': round((time.perf_counter() - t0) * 1000, 3)})
+
+
+@app.route('/browse')
+def browse_facets():
+    """패싯 조합으로 시리즈를 필터링합니다. 예: /browse?writers=X&genres=Y&status=완결&page=1"""
+    for w in request.args.getlist('writers'): suggest_index.touch(('w', normalize_nfc(w).strip()))
+    page = request.args.get('page', 1, type=int)
+    psize = request.args.get('page_size', 50, type=int)
+    cache_key = get_cache_key()
+    cached = cache_get(cache_key)
+    if cached: return cached
+    where_stmt, params = build_facet_filter(request.args)
+    conn = sqlite3.connect(METADATA_DB_PATH); conn.row_factory = sqlite3.Row
+    total = conn.execute(f"SELECT COUNT(*) FROM entries e WHERE {where_stmt}", params).fetchone()[0]
+    rows = conn.execute(f"SELECT e.* FROM entries e WHERE {where_stmt} ORDER BY e.title LIMIT ? OFFSET ?",
+                        params + [psize, (page - 1) * psize]).fetchall()
+    placeholders = get_placeholders(conn, [r['poster_url'] for r in rows])
+    conn.close()
+    items = []
+    for r in rows:
+        meta = json.loads(r['metadata'] or '{}')
+        meta['poster_url'] = r['poster_url']
+        meta['placeholder'] = placeholders.get(r['poster_url'])
+        meta['title'] = r['title']
+        meta['category'] = r['rel_path'].split('/')[0] if r['rel_path'] else "Unknown"
+        items.append({'name': r['title'] or r['name'], 'isDirectory': bool(r['is_dir']), 'path': r['rel_path'],
+                      'metadata': meta})
+    return cached_jsonify(cache_key, [('tree', request.args.get('category', '').strip('/'))],
+                          {'total_items': total, 'page': page, 'page_size': psize, 'items': items},
+                          placeholders_ready(placeholders, [r['poster_url'] for r in rows]))
+
+
+@app.route('/metadata/cache_stats')
+def cache_stats():
+    with response_cache_lock:
+        stats = dict(response_cache_stats, entries=len(response_cache), max_bytes=RESPONSE_CACHE_MAX_BYTES)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return jsonify(stats)
 
 
 @app.route('/zip_entries')
@@ -553,11 +2333,15 @@ def zip_entries():
     abs_p = os.path.join(BASE_PATH, path)
     if not os.path.isfile(abs_p): return jsonify([])
     try:
-        with zipfile.ZipFile(abs_p, 'r') as z:
-            imgs = sorted([n for n in z.namelist() if is_image_file(n)])
-            return jsonify(imgs)
-    except:
-        return jsonify([])
+        pages = get_manifest(abs_p)
+    except ArchiveUnavailable as e:
+        logger.warning(str(e))
+        return str(e), 501
+    # detail=1 이면 해상도/크기 정보를 포함하여 클라이언트가 미리 레이아웃할 수 있게 합니다.
+    if request.args.get('detail', 0, type=int):
+        return jsonify([{'name': p['entry'], 'width': p['width'], 'height': p['height'], 'size': p['file_size']}
+                        for p in pages])
+    return jsonify([p['entry'] for p in pages])
 
 
 @app.route('/download_zip_entry')
@@ -567,17 +2351,79 @@ def download_zip_entry():
     abs_p = os.path.join(BASE_PATH, path)
     if not os.path.isfile(abs_p): return "No Zip", 404
     try:
-        with zipfile.ZipFile(abs_p, 'r') as z:
-            with z.open(entry) as f: return send_file(io.BytesIO(f.read()), mimetype='image/jpeg')
+        with open_archive(abs_p) as a: return send_file(io.BytesIO(a.read(entry)), mimetype='image/jpeg')
+    except ArchiveUnavailable as e:
+        logger.warning(str(e))
+        return str(e), 501
     except:
         return "Error", 500
 
 
+def resize_image_bytes(data, max_width):
+    """max_width 보다 넓은 이미지를 JPEG로 축소합니다. PIL이 없거나 실패하면 원본을 그대로 반환합니다."""
+    if not HAS_PIL or not max_width: return data
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            if im.width <= max_width: return data
+            h = max(1, int(im.height * max_width / im.width))
+            im = im.convert('RGB').resize((max_width, h), Image.LANCZOS)
+            out = io.BytesIO()
+            im.save(out, format='JPEG', quality=85)
+            return out.getvalue()
+    except Exception as e:
+        logger.error(f"Resize Error: {e}")
+        return data
+
+
+@app.route('/zip_bundle')
+def zip_bundle():
+    """
+    한 권(또는 페이지 범위)을 단일 응답으로 스트리밍합니다.
+    프레임 형식: [index(4B)][name_len(4B)][data_len(4B)][name][data] (big-endian), 아카이브는 한 번만 엽니다.
+    start: 시작 페이지 인덱스(이어받기), count: 페이지 수(생략 시 끝까지), max_width: 리사이즈 폭(선택)
+    """
+    path = urllib.parse.unquote(request.args.get('path', ''))
+    start = max(0, request.args.get('start', 0, type=int))
+    count = request.args.get('count', 0, type=int)
+    max_width = request.args.get('max_width', 0, type=int)
+    abs_p = os.path.join(BASE_PATH, path)
+    if not os.path.isfile(abs_p): return "No Zip", 404
+    try:
+        imgs = [p['entry'] for p in get_manifest(abs_p)]
+        a = open_archive(abs_p)
+    except ArchiveUnavailable as e:
+        return str(e), 501
+    except:
+        return "Error", 500
+    end = len(imgs) if count <= 0 else min(len(imgs), start + count)
+
+    def generate():
+        try:
+            for i in range(start, end):
+                name = imgs[i]
+                try:
+                    data = a.read(name)
+                except Exception as e:
+                    logger.error(f"Bundle Entry Error {path}:{name}: {e}")
+                    data = b''
+                data = resize_image_bytes(data, max_width) if data else data
+                name_b = name.encode('utf-8')
+                yield struct.pack('>III', i, len(name_b), len(data)) + name_b + data
+        finally:
+            a.close()
+
+    headers = {'X-Bundle-Total': str(len(imgs)), 'X-Bundle-Start': str(start), 'X-Bundle-End': str(end)}
+    response = Response(stream_with_context(generate()), mimetype='application/x-nas-bundle', headers=headers)
+    response.call_on_close(a.close)  # 스트림을 시작하기 전에 연결이 끊겨도 아카이브를 반납합니다.
+    return response
+
+
 @app.route('/monitor')
 def monitor_metadata():
     cat = request.args.get('category', '완결A')
     conn = sqlite3.connect(METADATA_DB_PATH); conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT * FROM entries WHERE rel_path LIKE ? AND depth >= 2 ORDER BY title", (cat + '/%',)).fetchall()
+    where, params = subtree_clause(cat)
+    rows = conn.execute(f"SELECT * FROM entries WHERE {where} AND depth >= 2 ORDER BY title", params).fetchall()
     conn.close()
     processed = []
     for r in rows:
@@ -635,7 +2481,7 @@ def manual_inject():
         rel_path = f"{cat}/{title}"; abs_path = os.path.join(BASE_PATH, rel_path).replace(os.sep, '/'); p_hash = get_path_hash(abs_path); parent_hash = get_path_hash(os.path.join(BASE_PATH, cat))
         meta = {"summary": "수동 데이터", "writers": [w.strip() for w in writers if w.strip()], "publisher": publisher, "status": "완결"}
         item = (p_hash, parent_hash, abs_path, rel_path, title, 1, "", title, 3, time.time(), json.dumps(meta, ensure_ascii=False))
-        conn = sqlite3.connect(METADATA_DB_PATH); conn.execute('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', item); conn.commit(); conn.close()
+        conn = sqlite3.connect(METADATA_DB_PATH); save_entries(conn, [item]); conn.close()
         return f"완료. <a href='/monitor?category={cat}'>확인</a>"
     return '<form method="post">카테고리: <input name="category"><br>제목: <input name="title"><br><button type="submit">주입</button></form>'
 
@@ -656,7 +2502,26 @@ def check_zombie():
     return jsonify([dict(r) for r in rows])
 
 
-if __name__ == '__main__':
+def start_services():
+    """색인 초기화와 백그라운드 작업(초기 스캔, 감시, 변경 로그 정리, 스냅샷)을 시작합니다.
+    단독 실행과 다중 라이브러리 호스트(NasLibraryHost.py)가 함께 사용합니다."""
+    if REPLICA_MODE:
+        start_replica()
+        return
     init_db()
-    for cat in ALLOWED_CATEGORIES: scanning_pool.submit(scan_folder_sync, os.path.join(BASE_PATH, cat), 1)
-    app.run(host='0.0.0.0', port=5555, threaded=True)
+    start_placeholder_pool()
+    build_suggest_index()
+    threading.Thread(target=change_compact_worker, daemon=True).start()
+    for cat in ALLOWED_CATEGORIES:
+        scanning_pool.submit(run_profiled, 'scan_folder_sync', scan_folder_sync, os.path.join(BASE_PATH, cat), 1)
+    if WATCHER_ENABLED: start_watcher()
+    if SNAPSHOT_INTERVAL > 0: threading.Thread(target=snapshot_export_worker, daemon=True).start()
+
+
+if __name__ == '__main__':
+    start_services()
+    if SERVE_MODE == 'asgi':
+        import NasAsgi
+        NasAsgi.serve(app, '0.0.0.0', 5555, ASGI_WORKERS, admission)
+    else:
+        app.run(host='0.0.0.0', port=5555, threaded=True)
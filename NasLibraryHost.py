@@ -0,0 +1,351 @@
+"""
+단일 프로세스 다중 라이브러리 모드.
+
+config.yml의 libraries 목록에 있는 라이브러리(만화/웹툰)를 한 프로세스에서 함께 서비스합니다.
+라이브러리마다 서버 모듈을 별도 인스턴스로 불러와 루트 경로, DB, 카테고리, 규칙(settings)을 따로 두고,
+아래 자원은 모든 라이브러리가 하나씩만 공유합니다.
+- I/O 스케줄러: 요청은 하나의 부하 제어(Admission) 상태로 등급별/전체 동시 실행 수를 전역 제한하고,
+  백그라운드 작업(스캔, 매니페스트, 플레이스홀더, 포스터 확정, 웹툰 타일 생성)은 모두 run_profiled를 거쳐
+  공용 풀과 디스크 동시 작업 수(disk_concurrency) 상한을 따릅니다.
+- 아카이브 핸들 풀 (NasShared.ArchiveHandlePool)
+- DB 쓰기 스레드 (라이브러리별 DB 파일에 대한 색인 쓰기를 한 스레드에서 직렬화. 모듈의 save_entries/delete_entries/db_write를
+  바꿔 끼우므로 매니페스트, 플레이스홀더, 변경 로그 정리, 웹툰 포스터 확정도 포함되며, 시작 시 init_db의 스키마 생성만 제외)
+- 플레이스홀더(LQIP) 프로세스 풀 (spawn, placeholder_workers개)
+- 캐시 디스크 예산: cache_budget_gb를 라이브러리 수로 나눠, 만화 페이지 캐시는 각 모듈의 LRU 정리기(사용 중인 폴더 보호)가,
+  웹툰 썸네일/타일 캐시는 CacheBudget이 합산 LRU로 지킵니다.
+- 메모리 예산: 응답 캐시 상한을 만화 라이브러리 수로 나눠 배정
+
+사용법: python NasLibraryHost.py [config.yml]
+"""
+import os, sys, time, queue, sqlite3, logging, threading, functools, importlib.util, multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+import yaml
+from flask import jsonify
+import NasShared
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s', stream=sys.stdout)
+logger = logging.getLogger("NasLibraryHost")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LIBRARY_MODULES = {'comics': 'NasComicsViewerServer.py', 'webtoon': 'NasWebtoonViewerServer.py'}
+LIBRARY_CATEGORY_ATTRS = {'comics': 'ALLOWED_CATEGORIES', 'webtoon': 'WEBTOON_CATEGORIES'}
+
+HOST_DEFAULTS = {
+    'host': '0.0.0.0',
+    'port': 5550,  # port가 없는 라이브러리는 이 포트의 /<name> 아래에 붙습니다.
+    'serve_mode': 'threaded',  # 'threaded' | 'asgi'
+    'asgi_workers': 48,
+    'request_limit': 32,  # 모든 라이브러리 합산 동시 요청 수
+    'scan_workers': 10,
+    'background_workers': 4,
+    'tile_workers': 4,
+    'placeholder_workers': 2,  # 모든 만화 라이브러리가 함께 쓰는 플레이스홀더 축소 프로세스 수
+    'disk_concurrency': 6,  # 모든 라이브러리 합산 백그라운드 디스크 작업 수
+    'archive_handles': 128,
+    'cache_budget_gb': 20,
+    'cache_sweep_interval': 300,
+    'memory_budget_mb': 256,
+}
+# 라이브러리 settings로 바꿀 수 없는 이름 -> 대신 쓸 설정. 호스트가 직접 채우거나 공용 자원으로 바꿔 끼우는 값입니다.
+HOST_MANAGED_SETTINGS = {
+    'BASE_PATH': 'root', 'METADATA_DB_PATH': 'db',
+    'PAGE_CACHE_DIR': 'cache_dir', 'THUMB_CACHE_DIR': 'cache_dir', 'TILE_CACHE_DIR': 'cache_dir', 'SNAPSHOT_DIR': 'snapshot_dir',
+    'ALLOWED_CATEGORIES': 'categories', 'WEBTOON_CATEGORIES': 'categories',
+    'ARCHIVE_HANDLE_LIMIT': 'host.archive_handles', 'ADMISSION_TOTAL_LIMIT': 'host.request_limit',
+    'PAGE_CACHE_MAX_BYTES': 'host.cache_budget_gb', 'RESPONSE_CACHE_MAX_BYTES': 'host.memory_budget_mb',
+    'SERVE_MODE': 'host.serve_mode', 'ASGI_WORKERS': 'host.asgi_workers',
+}
+CACHE_GRACE_SEC = 60  # 방금 사용한 캐시는 예산을 넘어도 지우지 않습니다. (읽는 중일 수 있음)
+
+
+class SharedDBWriter:
+    """모든 라이브러리의 색인 쓰기를 스레드 하나에서 차례로 실행합니다. DB 파일마다 연결을 하나씩 유지합니다."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.conns = {}
+        self.stats = {'writes': 0, 'errors': 0}
+        threading.Thread(target=self.worker, daemon=True, name="db-writer").start()
+
+    def worker(self):
+        while True:
+            db_path, fn, args, fut = self.queue.get()
+            conn = self.conns.get(db_path)
+            try:
+                if conn is None:
+                    conn = self.conns[db_path] = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL;')
+                    conn.execute('PRAGMA synchronous=NORMAL;')
+                fut.set_result(fn(conn, *args))
+                self.stats['writes'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                if conn is not None and conn.in_transaction: conn.rollback()
+                fut.set_exception(e)
+
+    def run(self, db_path, fn, *args):
+        fut = Future()
+        self.queue.put((db_path, fn, args, fut))
+        return fut.result()
+
+    def wrap(self, module, fn):
+        """module의 save_entries(conn, items) 같은 쓰기 함수를 공용 쓰기 스레드에서 실행하도록 감쌉니다."""
+        @functools.wraps(fn)
+        def write(conn, *args):
+            return self.run(module.METADATA_DB_PATH, fn, *args)
+        return write
+
+    def bind(self, module):
+        """module.db_write(fn, *args)를 대신할 함수. fn(conn, *args)를 공용 쓰기 스레드에서 module의 DB로 실행합니다."""
+        def db_write(fn, *args):
+            return self.run(module.METADATA_DB_PATH, fn, *args)
+        return db_write
+
+    def info(self):
+        return dict(self.stats, queued=self.queue.qsize(), databases=len(self.conns))
+
+
+class DiskScheduler:
+    """백그라운드 작업(run_profiled로 실행되는 작업)의 디스크 동시 작업 수를 모든 라이브러리에 걸쳐 제한합니다.
+    서버 모듈은 디스크를 쓰는 백그라운드 작업을 모두 run_profiled로 제출해야 이 상한이 적용됩니다.
+    요청 쪽은 공유된 부하 제어 상태가 등급 우선순위대로 제한하므로, 여기서는 백그라운드가 디스크를 독점하지 않게만 합니다."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.cond = threading.Condition()
+        self.stats = {'active': 0, 'waiting': 0, 'completed': 0}
+
+    def wrap(self, run_profiled):
+        @functools.wraps(run_profiled)
+        def run(name, fn, *args, **kwargs):
+            with self.cond:
+                self.stats['waiting'] += 1
+                while self.stats['active'] >= self.limit: self.cond.wait()
+                self.stats['waiting'] -= 1
+                self.stats['active'] += 1
+            try:
+                return run_profiled(name, fn, *args, **kwargs)
+            finally:
+                with self.cond:
+                    self.stats['active'] -= 1
+                    self.stats['completed'] += 1
+                    self.cond.notify()
+        return run
+
+    def info(self):
+        with self.cond: return dict(self.stats, limit=self.limit)
+
+
+class CacheBudget:
+    """여러 라이브러리의 캐시 폴더(웹툰 썸네일/타일)를 합산해 max_bytes를 넘으면 가장 오래 쓰지 않은 파일부터 지웁니다.
+    만화 페이지 캐시는 읽는 중인 폴더를 아는 모듈 자신의 정리기(evict_page_cache)에 맡기고 여기서 다루지 않습니다.
+    타일은 조각 단위로 지워질 수 있으며, 빠진 조각이 있으면 웹툰 모듈의 generate_tiles가 묶음 전체를 다시 만듭니다."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.dirs = []
+        self.stats = {'bytes': 0, 'items': 0, 'evicted': 0, 'sweeps': 0}
+
+    def add(self, path):
+        if path not in self.dirs: self.dirs.append(path)
+
+    def collect(self, path, out):
+        for e in os.scandir(path):
+            if e.name.endswith('.tmp'): continue
+            try:
+                if e.is_dir():
+                    self.collect(e.path, out)
+                else:
+                    st = e.stat()
+                    out.append((max(st.st_atime, st.st_mtime), st.st_size, e.path))
+            except OSError:
+                continue
+
+    def sweep(self):
+        items = []
+        for d in self.dirs:
+            if os.path.isdir(d): self.collect(d, items)
+        total = sum(it[1] for it in items)
+        now = time.time()
+        for used, size, path in sorted(items):
+            if total <= self.max_bytes: break
+            if now - used < CACHE_GRACE_SEC: continue
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+            self.stats['evicted'] += 1
+        self.stats.update(bytes=total, items=len(items), sweeps=self.stats['sweeps'] + 1)
+
+    def worker(self, interval):
+        while True:
+            try: self.sweep()
+            except Exception as e: logger.error(f"Cache Sweep Error: {e}")
+            time.sleep(interval)
+
+    def info(self):
+        return dict(self.stats, max_bytes=self.max_bytes, dirs=self.dirs)
+
+
+def load_config(path):
+    with open(path, 'r', encoding='utf-8') as f: data = yaml.safe_load(f) or {}
+    cfg = dict(HOST_DEFAULTS, **(data.get('host') or {}))
+    libs = data.get('libraries') or []
+    if not libs: raise ValueError(f"No libraries configured in {path}")
+    names = [lib.get('name') for lib in libs]
+    if None in names or len(set(names)) != len(names): raise ValueError("Every library needs a unique name")
+    return cfg, libs
+
+
+def load_library(lib):
+    """서버 모듈을 라이브러리 전용 인스턴스(nas_library_<name>)로 불러오고 라이브러리 설정을 적용합니다."""
+    kind, name = lib.get('type', 'comics'), lib['name']
+    if kind not in LIBRARY_MODULES: raise ValueError(f"[{name}] Unknown library type: {kind}")
+    mod_name = f"nas_library_{name}"
+    spec = importlib.util.spec_from_file_location(mod_name, os.path.join(HERE, LIBRARY_MODULES[kind]))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = module
+    spec.loader.exec_module(module)
+
+    module.BASE_PATH = lib['root']
+    module.METADATA_DB_PATH = lib['db']
+    cache_dir = lib.get('cache_dir') or os.path.join(os.path.dirname(lib['db']), f"{name}_cache")
+    if kind == 'comics':
+        module.PAGE_CACHE_DIR = cache_dir
+        module.SNAPSHOT_DIR = lib.get('snapshot_dir') or os.path.join(os.path.dirname(lib['db']), f"{name}_snapshots")
+    else:
+        module.THUMB_CACHE_DIR = cache_dir
+        module.TILE_CACHE_DIR = os.path.join(cache_dir, "tiles")
+    if 'categories' in lib: setattr(module, LIBRARY_CATEGORY_ATTRS[kind], list(lib['categories']))
+    for key, value in (lib.get('settings') or {}).items():
+        if not key.isupper() or not hasattr(module, key): raise ValueError(f"[{name}] Unknown setting: {key}")
+        if key in HOST_MANAGED_SETTINGS:
+            raise ValueError(f"[{name}] {key} is managed by the host; use '{HOST_MANAGED_SETTINGS[key]}' instead")
+        setattr(module, key, value)
+    rebuild_derived_state(module)
+    return module
+
+
+def rebuild_derived_state(module):
+    """모듈을 불러올 때 설정값으로 만들어진 객체를 settings 적용 후 다시 만듭니다.
+    (archive_handles와 admission은 LibraryHost가 공용 인스턴스로 바꿔 끼우며, admission은 적용된 등급 설정으로 만듭니다)"""
+    module.profiler = NasShared.Profiler(module.logger, module.PROFILE_ENABLED, module.PROFILE_SAMPLE_RATE,
+                                         module.PROFILE_SLOW_MS, module.PROFILE_INTERVAL, module.PROFILE_MAX_CAPTURES)
+
+
+class LibraryHost:
+    def __init__(self, cfg, libs):
+        self.cfg = cfg
+        self.libraries = [(lib, load_library(lib)) for lib in libs]
+        self.scan_pool = ThreadPoolExecutor(max_workers=cfg['scan_workers'], thread_name_prefix="scan")
+        self.background_pool = ThreadPoolExecutor(max_workers=cfg['background_workers'], thread_name_prefix="background")
+        self.tile_pool = ThreadPoolExecutor(max_workers=cfg['tile_workers'], thread_name_prefix="tile")
+        self.archive_handles = NasShared.ArchiveHandlePool(cfg['archive_handles'])
+        self.db_writer = SharedDBWriter()
+        self.placeholder_proc_pool = None
+        if any(lib.get('type', 'comics') == 'comics' and m.HAS_PIL for lib, m in self.libraries):
+            self.placeholder_proc_pool = ProcessPoolExecutor(max_workers=cfg['placeholder_workers'],
+                                                             mp_context=multiprocessing.get_context('spawn'))
+        self.disk = DiskScheduler(cfg['disk_concurrency'])
+        # 캐시 디스크 예산은 라이브러리마다 같은 몫으로 나눕니다. (웹툰 몫은 CacheBudget이 합산해서 관리)
+        self.cache_share = int(cfg['cache_budget_gb'] * 1024 * 1024 * 1024 / len(self.libraries))
+        webtoons = sum(1 for lib, m in self.libraries if lib.get('type', 'comics') == 'webtoon')
+        self.cache_budget = CacheBudget(self.cache_share * webtoons)
+        self.admission = self.build_admission()
+        self.share_resources()
+
+    def build_admission(self):
+        """모든 라이브러리가 함께 쓰는 부하 제어 상태. 등급 설정은 먼저 불러온 라이브러리의 것을 따르고,
+        전체 동시 실행 수는 host.request_limit 입니다."""
+        classes, priority = {}, []
+        for lib, module in self.libraries:
+            for cls, cfg in module.ADMISSION_CLASSES.items():
+                if classes.setdefault(cls, cfg) != cfg:
+                    logger.warning(f"[{lib['name']}] Admission class '{cls}' differs from an earlier library; using the first")
+            priority += [c for c in module.ADMISSION_PRIORITY if c not in priority]
+        for lib, module in self.libraries:
+            unknown = set(module.ROUTE_CLASSES.values()) - set(classes)
+            if unknown: raise ValueError(f"[{lib['name']}] ROUTE_CLASSES uses undefined admission classes: {sorted(unknown)}")
+        return NasShared.AdmissionControl(classes, priority, self.cfg['request_limit'])
+
+    def share_resources(self):
+        """각 라이브러리 모듈이 만든 풀/핸들 풀/쓰기 함수/부하 제어 상태를 호스트의 공용 인스턴스로 바꿔 끼웁니다."""
+        comics = [m for lib, m in self.libraries if lib.get('type', 'comics') == 'comics']
+        memory_share = int(self.cfg['memory_budget_mb'] * 1024 * 1024 / max(len(comics), 1))
+        for lib, module in self.libraries:
+            module.scanning_pool = self.scan_pool
+            for attr in ('manifest_pool', 'placeholder_pool', 'poster_pool'):
+                if hasattr(module, attr): setattr(module, attr, self.background_pool)
+            if hasattr(module, 'tile_pool'): module.tile_pool = self.tile_pool
+            module.archive_handles = self.archive_handles
+            module.run_profiled = self.disk.wrap(module.run_profiled)
+            for attr in ('save_entries', 'delete_entries'):
+                if hasattr(module, attr): setattr(module, attr, self.db_writer.wrap(module, getattr(module, attr)))
+            module.db_write = self.db_writer.bind(module)
+            if hasattr(module, 'placeholder_proc_pool'): module.placeholder_proc_pool = self.placeholder_proc_pool
+            module.admission = self.admission
+            module.ADMISSION_TOTAL_LIMIT = self.cfg['request_limit']
+            if module in comics:
+                module.PAGE_CACHE_MAX_BYTES = self.cache_share
+                module.RESPONSE_CACHE_MAX_BYTES = memory_share
+            else:
+                self.cache_budget.add(module.THUMB_CACHE_DIR)
+            module.app.add_url_rule('/metadata/host', 'host_status', self.status)
+
+    def status(self):
+        libs = [{'name': lib['name'], 'type': lib.get('type', 'comics'), 'root': lib['root'],
+                 'port': lib.get('port'), 'mount': None if lib.get('port') else '/' + lib['name']}
+                for lib, m in self.libraries]
+        return jsonify({
+            'libraries': libs, 'disk': self.disk.info(), 'db_writer': self.db_writer.info(),
+            'archive_handles': self.archive_handles.info(),
+            'cache': dict(self.cache_budget.info(), library_share=self.cache_share),
+            'admission': self.admission.info()})
+
+    def start(self):
+        for lib, module in self.libraries:
+            logger.info(f"📚 Starting library '{lib['name']}' ({lib.get('type', 'comics')}) at {lib['root']}")
+            module.start_services()
+        if self.cache_budget.dirs:
+            threading.Thread(target=self.cache_budget.worker, args=(self.cfg['cache_sweep_interval'],), daemon=True).start()
+
+    def listeners(self):
+        """{port: wsgi_app}. port가 지정된 라이브러리는 자기 포트로, 나머지는 host.port의 /<name> 아래로 묶습니다."""
+        by_port, mounted = {}, {}
+        for lib, module in self.libraries:
+            port = lib.get('port')
+            if not port:
+                mounted['/' + lib['name']] = module.app
+                continue
+            if port in by_port: raise ValueError(f"Port {port} is assigned to more than one library")
+            by_port[port] = module.app
+        if mounted:
+            from werkzeug.middleware.dispatcher import DispatcherMiddleware
+            from werkzeug.exceptions import NotFound
+            if self.cfg['port'] in by_port: raise ValueError(f"Host port {self.cfg['port']} is also a library port")
+            by_port[self.cfg['port']] = DispatcherMiddleware(NotFound(), mounted)
+        return by_port
+
+    def serve(self):
+        apps = self.listeners()
+        if self.cfg['serve_mode'] == 'asgi':
+            import NasAsgi
+            NasAsgi.serve_many(apps, self.cfg['host'], self.cfg['asgi_workers'], self.admission)
+            return
+        from werkzeug.serving import make_server
+        servers = [make_server(self.cfg['host'], port, app, threaded=True) for port, app in apps.items()]
+        threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers]
+        for t in threads: t.start()
+        logger.info(f"🌐 Serving {len(self.libraries)} libraries on ports {sorted(apps)}")
+        for t in threads: t.join()
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(HERE, 'config.yml')
+    cfg, libs = load_config(path)
+    host = LibraryHost(cfg, libs)
+    host.start()
+    host.serve()
+
+
+if __name__ == '__main__':
+    main()
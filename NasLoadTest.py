@@ -0,0 +1,93 @@
+"""
+NAS 서버 동시 접속 부하 테스트.
+
+모바일 클라이언트처럼 keep-alive 연결을 하나씩 유지하면서 think 간격으로 요청을 보내는 가상 사용자를
+동시 접속 수별로 띄우고, 처리량/지연 시간/오류 수를 출력합니다.
+스레드 모드(threaded=True)와 ASGI 모드(SERVE_MODE = 'asgi')를 같은 조건으로 비교하는 용도입니다.
+
+예) python NasLoadTest.py --url http://127.0.0.1:5555 --path "/scan?path=완결A" -c 50 200 1000 --duration 20
+"""
+import argparse, asyncio, time, urllib.parse
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+    size = 0
+    if 'content-length' in headers:
+        size = int(headers['content-length'])
+        await reader.readexactly(size)
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            n = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(n + 2)
+            size += n
+            if n == 0: break
+    else:
+        size = len(await reader.read())
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    return status, size, keep_alive
+
+
+async def virtual_user(host, port, target, think, deadline, stats):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), 10)
+                stats['connections'] += 1
+            t0 = time.monotonic()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n".encode('utf-8'))
+            await writer.drain()
+            status, size, keep_alive = await asyncio.wait_for(read_response(reader), 30)
+            stats['latencies'].append(time.monotonic() - t0)
+            stats['bytes'] += size
+            stats['status'][status] = stats['status'].get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except Exception as e:
+            stats['errors'] += 1
+            stats['error_types'][type(e).__name__] = stats['error_types'].get(type(e).__name__, 0) + 1
+            if writer is not None: writer.close()
+            writer = None
+            await asyncio.sleep(0.5)
+        await asyncio.sleep(think)
+    if writer is not None: writer.close()
+
+
+async def run_level(host, port, target, concurrency, duration, think):
+    stats = {'latencies': [], 'bytes': 0, 'errors': 0, 'error_types': {}, 'status': {}, 'connections': 0}
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*[virtual_user(host, port, target, think, deadline, stats) for _ in range(concurrency)])
+    elapsed = time.monotonic() - started
+    lat = sorted(stats['latencies'])
+    pct = lambda p: lat[min(len(lat) - 1, int(len(lat) * p))] * 1000 if lat else 0.0
+    print(f"c={concurrency:5d}  ok={len(lat):7d}  rps={len(lat) / elapsed:8.1f}  p50={pct(0.5):7.1f}ms  "
+          f"p99={pct(0.99):8.1f}ms  errors={stats['errors']} {stats['error_types'] or ''}  status={stats['status']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NAS server keep-alive concurrency load test")
+    ap.add_argument('--url', default='http://127.0.0.1:5555')
+    ap.add_argument('--path', default='/scan?path=완결A')
+    ap.add_argument('-c', '--concurrency', type=int, nargs='+', default=[50, 200, 1000])
+    ap.add_argument('--duration', type=float, default=20)
+    ap.add_argument('--think', type=float, default=1.0, help="요청 사이 대기 시간(초), 모바일 사용자의 읽는 시간")
+    args = ap.parse_args()
+    u = urllib.parse.urlsplit(args.url)
+    path, _, query = args.path.partition('?')
+    target = urllib.parse.quote(path) + ('?' + urllib.parse.quote(query, safe='=&') if query else '')
+    for c in args.concurrency:
+        asyncio.run(run_level(u.hostname, u.port or 80, target, c, args.duration, args.think))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+NAS 서버 공용 자원.
+
+두 서버(만화/웹툰)가 같은 방식으로 쓰는 자원을 한 곳에 둡니다. 단독 실행 시에는 서버마다 하나씩 만들고,
+다중 라이브러리 호스트(NasLibraryHost.py)에서는 모든 라이브러리가 인스턴스 하나를 공유합니다.
+"""
+import os, io, sys, time, base64, random, linecache, itertools, threading, zipfile, logging
+from collections import OrderedDict, Counter, deque
+
+from flask import request, g, Response
+
+logger = logging.getLogger("NasShared")
+
+# ASGI 모드에서 실행 스레드가 모두 찬 상태로 들어온 요청 표시 (NasAsgi가 environ에 넣음).
+# 이런 요청은 부하 제어 대기 없이 바로 저하 응답 또는 503으로 처리합니다.
+OVERLOAD_ENVIRON_KEY = 'nas.overloaded'
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+def make_lqip(data, size=16):
+    """이미지를 size px 이내로 줄인 저화질 JPEG data URI(수백 바이트)를 만듭니다.
+    서버 모듈의 프로세스 풀(spawn)에서 실행되므로, 자식 프로세스가 가볍게 불러올 수 있는 이 모듈에 둡니다."""
+    with Image.open(io.BytesIO(data)) as im:
+        im.draft('RGB', (size * 8, size * 8))  # JPEG는 축소 디코딩으로 빠르게
+        im = im.convert('RGB')
+        im.thumbnail((size, size))
+        out = io.BytesIO()
+        im.save(out, format='JPEG', quality=40, optimize=True)
+    return "data:image/jpeg;base64," + base64.b64encode(out.getvalue()).decode('ascii')
+
+
+class ArchiveLease:
+    """풀에서 빌린 ZipFile 핸들. with 블록 또는 release()로 반납합니다."""
+
+    def __init__(self, pool, path, handle):
+        self.pool = pool
+        self.path = path
+        self.handle = handle
+        self.z = handle['zip']
+
+    def release(self):
+        if self.handle is None: return
+        self.pool._release(self.handle)
+        self.handle = None
+
+    def __enter__(self): return self.z
+
+    def __exit__(self, *exc): self.release()
+
+
+class ArchiveHandlePool:
+    """열린 ZipFile 핸들을 경로별로 재사용하는 LRU 풀.
+    같은 아카이브의 페이지 요청마다 파일을 다시 열고 중앙 디렉터리를 다시 읽지 않도록 합니다.
+    ZipFile은 여러 스레드가 서로 다른 항목을 동시에 열어 읽을 수 있으므로 아카이브당 핸들 하나를 공유하며,
+    파일이 바뀌면(mtime/size) 새로 엽니다. 사용 중인 핸들은 반납될 때까지 닫지 않습니다."""
+
+    def __init__(self, max_handles=64):
+        self.max_handles = max_handles
+        self.lock = threading.Lock()
+        self.handles = OrderedDict()  # path -> {'key', 'zip', 'users', 'retired'}
+        self.stats = {'hits': 0, 'opens': 0, 'evictions': 0}
+
+    def acquire(self, path):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            h = self.handles.get(path)
+            if h and h['key'] == key:
+                h['users'] += 1
+                self.handles.move_to_end(path)
+                self.stats['hits'] += 1
+                return ArchiveLease(self, path, h)
+        z = zipfile.ZipFile(path, 'r')  # 느린 열기는 잠금 밖에서
+        with self.lock:
+            h = self.handles.get(path)
+            if h and h['key'] == key:
+                h['users'] += 1
+                self.stats['hits'] += 1
+                z.close()
+                return ArchiveLease(self, path, h)
+            if h: self._retire(path, h)
+            h = self.handles[path] = {'key': key, 'zip': z, 'users': 1, 'retired': False}
+            self.stats['opens'] += 1
+            self._evict()
+            return ArchiveLease(self, path, h)
+
+    def _retire(self, path, h):
+        del self.handles[path]
+        h['retired'] = True
+        if not h['users']: h['zip'].close()
+
+    def _evict(self):
+        for path in list(self.handles):
+            if len(self.handles) <= self.max_handles: break
+            h = self.handles[path]
+            if h['users']: continue
+            self._retire(path, h)
+            self.stats['evictions'] += 1
+
+    def _release(self, h):
+        with self.lock:
+            h['users'] -= 1
+            if h['retired'] and not h['users']: h['zip'].close()
+            elif len(self.handles) > self.max_handles: self._evict()
+
+    def info(self):
+        with self.lock:
+            return dict(self.stats, open=len(self.handles), in_use=sum(1 for h in self.handles.values() if h['users']),
+                        max_handles=self.max_handles)
+
+
+# 스택 프레임을 구간(fs/db/decode/serialize)으로 분류하는 규칙: 모듈 파일명 → 구간, 최하단 프레임의 소스 줄 → 구간
+PROFILE_MODULE_CATEGORIES = [
+    ('db', ('sqlite3',)),
+    ('decode', ('zipfile', 'PIL', 'fitz', 'rarfile', 'py7zr', 'yaml', 'gzip', 'brotli')),
+    ('serialize', ('json', 'orjson', 'jinja2')),
+    ('fs', ('/os.py', 'genericpath', 'posixpath', 'shutil')),
+]
+PROFILE_LINE_CATEGORIES = [
+    ('db', ('execute', 'fetch', 'commit', 'sqlite3.connect')),
+    ('serialize', ('json', 'dumps', 'compress')),
+    ('decode', ('.read(', 'ZipFile', 'Image.', 'fitz.', 'yaml.', 'get_pixmap', 'tobytes')),
+    ('fs', ('scandir', 'os.stat', 'listdir', 'os.walk', 'open(', 'isdir', 'isfile', 'exists', 'getsize', 'getmtime',
+            'send_from_directory', 'send_file')),
+]
+
+
+def classify_frame(frame):
+    leaf = True
+    while frame is not None:
+        fn = frame.f_code.co_filename
+        for cat, mods in PROFILE_MODULE_CATEGORIES:
+            if any(m in fn for m in mods): return cat
+        if leaf:
+            line = linecache.getline(fn, frame.f_lineno)
+            for cat, words in PROFILE_LINE_CATEGORIES:
+                if any(w in line for w in words): return cat
+            leaf = False
+        frame = frame.f_back
+    return 'other'
+
+
+def collapse_stack(frame):
+    names = []
+    while frame is not None:
+        names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Profiler:
+    """요청/백그라운드 작업의 스택을 interval 간격으로 샘플링하는 통계적 프로파일러 (sys._current_frames 기반).
+    sample_rate 확률로 뽑힌 캡처와 slow_ms 보다 느린 캡처만 보관합니다.
+    캡처는 시작한 스레드를 기록해 두고 캡처 객체 자체로 끝내므로, 요청의 정리 단계가 다른 스레드에서
+    실행되어도(ASGI 모드, 스트리밍 응답) 다른 요청의 캡처를 건드리지 않습니다."""
+
+    def __init__(self, logger, enabled=False, sample_rate=0.01, slow_ms=1000, interval=0.005, max_captures=200):
+        self.logger = logger
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.active = {}  # id(cap) -> 진행 중인 캡처
+        self.captures = deque(maxlen=max_captures)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.sampler_started = False
+
+    def sampler(self):
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            dt, last = now - last, now
+            with self.lock:
+                if not self.active: continue
+                frames = sys._current_frames()
+                for cap in self.active.values():
+                    frame = frames.get(cap['thread'])
+                    if frame is None: continue
+                    cap['stacks'][collapse_stack(frame)] += 1
+                    cap['breakdown'][classify_frame(frame)] += dt * 1000
+                    cap['samples'] += 1
+
+    def start(self, kind, route, params):
+        if not self.enabled: return None
+        if not self.sampler_started:
+            with self.lock:
+                if not self.sampler_started:
+                    threading.Thread(target=self.sampler, daemon=True, name="profiler").start()
+                    self.sampler_started = True
+        cap = {'kind': kind, 'route': route, 'params': params, 'started': time.time(), 't0': time.perf_counter(),
+               'thread': threading.get_ident(), 'samples': 0, 'stacks': Counter(), 'breakdown': Counter()}
+        with self.lock: self.active[id(cap)] = cap
+        return cap
+
+    def stop(self, cap):
+        """캡처를 끝내고, 표본으로 뽑혔거나 느린 경우에만 보관합니다."""
+        if cap is None: return
+        with self.lock: self.active.pop(id(cap), None)
+        duration_ms = (time.perf_counter() - cap.pop('t0')) * 1000
+        if duration_ms < self.slow_ms and random.random() >= self.sample_rate: return
+        cap['id'] = next(self.ids)
+        cap['duration_ms'] = round(duration_ms, 1)
+        cap['breakdown'] = {k: round(v, 1) for k, v in cap['breakdown'].items()}
+        del cap['thread']
+        with self.lock: self.captures.append(cap)
+        if duration_ms >= self.slow_ms:
+            self.logger.info(f"🐢 SLOW {cap['kind']} {cap['route']} {cap['duration_ms']}ms {cap['breakdown']}")
+
+    def run(self, name, fn, *args, **kwargs):
+        """백그라운드 작업(스캔 등)을 요청과 같은 방식으로 프로파일링하며 실행합니다."""
+        cap = self.start('job', name, {'args': [str(a) for a in args]})
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.stop(cap)
+
+    def info(self):
+        with self.lock: caps = list(self.captures)
+        return {'enabled': self.enabled, 'sample_rate': self.sample_rate, 'slow_ms': self.slow_ms,
+                'captures': [{k: v for k, v in c.items() if k != 'stacks'} for c in reversed(caps)]}
+
+    def folded(self, pid):
+        """캡처 하나를 flamegraph.pl / speedscope 에서 읽을 수 있는 collapsed-stack 텍스트로 반환합니다. 없으면 None."""
+        with self.lock: cap = next((c for c in self.captures if c['id'] == pid), None)
+        if cap is None: return None
+        return "\n".join(f"{stack} {n}" for stack, n in cap['stacks'].most_common()) + "\n"
+
+
+class AdmissionControl:
+    """요청을 등급별로 나눠 동시 실행 수와 대기열 길이를 제한합니다. (부하 제어)
+    classes: {등급: {'limit', 'queue', 'timeout'}}, priority: 우선순위가 높은 등급부터의 목록.
+    전체 동시 실행 수(total_limit)가 찼을 때는 우선순위가 높은 등급의 대기 요청부터 들어갑니다.
+
+    대기는 요청을 처리하는 스레드 안에서 Condition으로 이루어집니다. 요청마다 스레드가 있는 threaded 모드에서는
+    등급별 queue 길이가 곧 대기 스레드 수의 상한이지만, 스레드 수가 고정된 ASGI 모드에서는 대기 중인 요청이
+    실행 스레드를 점유하므로 max_waiters(전체 대기 수 상한)를 '스레드 수 - total_limit' 이하로 두어
+    들어갈 수 있게 된 요청이 항상 스레드를 얻도록 합니다. None이면 등급별 queue만 적용합니다."""
+
+    def __init__(self, classes, priority, total_limit, max_waiters=None):
+        self.classes = classes
+        self.priority = list(priority) + [c for c in classes if c not in priority]
+        self.total_limit = total_limit
+        self.max_waiters = max_waiters
+        self.cond = threading.Condition()
+        self.state = {c: {'active': 0, 'waiting': 0, 'admitted': 0, 'rejected': 0, 'degraded': 0} for c in classes}
+
+    def can_enter(self, cls):
+        st = self.state[cls]
+        if st['active'] >= self.classes[cls]['limit']: return False
+        if sum(s['active'] for s in self.state.values()) >= self.total_limit: return False
+        for higher in self.priority[:self.priority.index(cls)]:
+            hs = self.state[higher]
+            if hs['waiting'] > 0 and hs['active'] < self.classes[higher]['limit']: return False
+        return True
+
+    def queue_full(self, cls):
+        if self.state[cls]['waiting'] >= self.classes[cls]['queue']: return True
+        return self.max_waiters is not None and sum(s['waiting'] for s in self.state.values()) >= self.max_waiters
+
+    def acquire(self, cls):
+        """등급 cls의 실행 슬롯을 얻습니다. 대기열이 가득 찼거나 timeout 안에 못 얻으면 False."""
+        cfg, st = self.classes[cls], self.state[cls]
+        deadline = time.monotonic() + cfg['timeout']
+        with self.cond:
+            if not self.can_enter(cls) and self.queue_full(cls):
+                st['rejected'] += 1
+                return False
+            st['waiting'] += 1
+            try:
+                while not self.can_enter(cls):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        st['rejected'] += 1
+                        return False
+                    self.cond.wait(remaining)
+                st['active'] += 1
+                st['admitted'] += 1
+                return True
+            finally:
+                st['waiting'] -= 1
+
+    def release(self, cls):
+        with self.cond:
+            self.state[cls]['active'] -= 1
+            self.cond.notify_all()
+
+    def before_request(self, route_classes, degraded_response, retry_after, enabled=True):
+        """Flask before_request 훅 본체. 슬롯을 못 얻으면 degraded_response(cls)의 응답, 그것도 없으면 503을 돌려줍니다.
+        ASGI 계층이 과부하로 표시한 요청(OVERLOAD_ENVIRON_KEY)은 enabled와 관계없이 대기하지 않고 바로 내보냅니다."""
+        overloaded = request.environ.get(OVERLOAD_ENVIRON_KEY)
+        if not enabled and not overloaded: return None
+        cls = route_classes.get(request.path)
+        if overloaded: return self.shed(cls, degraded_response, retry_after)
+        if cls is None: return None
+        if self.acquire(cls):
+            g.admission = (self, cls)  # 호스트가 인스턴스를 바꿔 끼워도 같은 인스턴스에 반납하도록
+            return None
+        return self.shed(cls, degraded_response, retry_after)
+
+    def shed(self, cls, degraded_response, retry_after):
+        if cls is not None:
+            degraded = degraded_response(cls)
+            if degraded is not None:
+                with self.cond: self.state[cls]['degraded'] += 1
+                return degraded
+            if request.environ.get(OVERLOAD_ENVIRON_KEY):
+                with self.cond: self.state[cls]['rejected'] += 1
+        logger.warning(f"⛔ SHED {cls} {request.path}")
+        return Response("Server Busy", status=503, headers={'Retry-After': str(retry_after)})
+
+    @staticmethod
+    def teardown_request():
+        entry = g.pop('admission', None)
+        if entry: entry[0].release(entry[1])
+
+    def info(self):
+        with self.cond:
+            classes = {c: dict(self.state[c], **self.classes[c]) for c in self.priority}
+        return {'total_limit': self.total_limit, 'max_waiters': self.max_waiters,
+                'total_active': sum(c['active'] for c in classes.values()), 'classes': classes}
@@ -1,6 +1,8 @@
-from flask import Flask, jsonify, send_from_directory, request, send_file, Response, render_template_string, stream_with_context, redirect
+from flask import Flask, jsonify, send_from_directory, request, send_file, Response, render_template_string, stream_with_context, redirect, g
 import os, urllib.parse, unicodedata, logging, time, zipfile, io, sys, sqlite3, json, threading, hashlib, queue, urllib.request, yaml
 from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import NasShared
 
 # [로그 설정]
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s', stream=sys.stdout)
@@ -13,11 +15,24 @@ BASE_PATH = "/volume2/video/GDS3/GDRIVE/READING"
 METADATA_DB_PATH = '/volume2/video/NasWebtoonViewer.db'
 WEBTOON_CATEGORIES = ["가", "나", "다", "라", "마", "바", "사", "아", "자", "차", "카", "타", "파", "하", "기타", "0Z", "A-Z"]
 
+# 실행 모드: 'threaded' (Flask 기본, 요청당 스레드) | 'asgi' (NasAsgi + uvicorn, 제한된 스레드 풀)
+SERVE_MODE = 'threaded'
+ASGI_WORKERS = 32
+
 # 필터링할 폴더 목록
 EXCLUDED_FOLDERS = ["INCOMING", "Incoming", "incoming"]
 
 THUMB_CACHE_DIR = os.path.join(os.path.dirname(METADATA_DB_PATH), "webtoon_cache")
-if not os.path.exists(THUMB_CACHE_DIR): os.makedirs(THUMB_CACHE_DIR)
+
+# 긴 웹툰 스트립 분할(타일) 캐시
+TILE_CACHE_DIR = os.path.join(THUMB_CACHE_DIR, "tiles")
+DEFAULT_TILE_HEIGHT = 1280
+MIN_TILE_HEIGHT = 256  # 이보다 작은 tile_height 요청은 400으로 거절합니다. (조각 수 폭증 방지)
+MAX_TILE_HEIGHT = 16384
+PAGE_SIZE_CACHE_MAX = 50000  # 페이지 해상도 캐시 항목 수 상한 (LRU)
+
+# 열린 ZIP 핸들 재사용 (다중 라이브러리 호스트에서는 모든 라이브러리가 하나를 공유)
+ARCHIVE_HANDLE_LIMIT = 64
 
 # PDF/EPUB 처리를 위한 라이브러리 체크
 try:
@@ -27,6 +42,14 @@ except ImportError:
     HAS_FITZ = False
     logger.warning("PyMuPDF (fitz) not found. PDF/EPUB thumbnails will not be generated. Install with: pip install pymupdf")
 
+# 타일 분할을 위한 라이브러리 체크
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    logger.warning("Pillow (PIL) not found. Tall strips will not be tiled. Install with: pip install pillow")
+
 # --- 전역 상태 관리 ---
 scan_status = {
     "is_running": False,
@@ -39,12 +62,28 @@ scan_status = {
     "logs": []
 }
 log_queue = queue.Queue()
-db_queue = queue.Queue()
 scanning_pool = ThreadPoolExecutor(max_workers=10)
+archive_handles = NasShared.ArchiveHandlePool(ARCHIVE_HANDLE_LIMIT)
 
 # 페이지 수 캐시 (PDF/EPUB 로딩 속도 향상용)
 doc_page_cache = {}
 
+# 타일 생성 풀 및 진행 중인 작업 (같은 페이지를 중복 생성하지 않도록)
+tile_pool = ThreadPoolExecutor(max_workers=4)
+tile_jobs = {}
+tile_jobs_lock = threading.Lock()
+# 페이지 해상도 캐시: (abs_path, mtime, entry) -> (width, height), LRU
+page_size_cache = OrderedDict()
+page_size_lock = threading.Lock()
+
+# 포스터 지연 확정: 스캔 중에는 폴더를 한 번만 읽고, 하위 폴더 탐색이 필요한 포스터는 'poster://' 로 남겨 두었다가
+# 첫 표시(/download) 또는 낮은 우선순위 백그라운드 단계에서 확정합니다. 결과는 폴더 지문과 함께 posters 테이블에 캐시됩니다.
+poster_pool = ThreadPoolExecutor(max_workers=1)
+poster_pending = set()
+poster_lock = threading.Lock()
+# 스캔 때 기록한 후보: path_hash -> (폴더 지문, 하위 폴더 최대 5개, 첫 만화 파일)
+poster_candidates = {}
+
 def add_web_log(msg, type="INFO"):
     prefix = "✅ [SUCCESS]" if type=="SUCCESS" else "❌ [FAILED]" if type=="ERROR" else "🚢 [INIT]" if type=="INIT" else "📝 [UPDATE]"
     formatted_msg = f"{prefix} {msg}"
@@ -80,28 +119,26 @@ def get_depth(rel_path):
     return len(rel_path.strip('/').split('/'))
 
 # --- DB 엔진 ---
-def db_writer_worker():
+# 색인 쓰기는 save_entries(호출한 쪽의 연결을 받음)와 db_write(fn, *args)로만 합니다.
+# 다중 라이브러리 호스트는 두 함수를 공용 DB 쓰기 스레드로 바꿔 끼웁니다. (init_db의 스키마 생성은 제외)
+def db_write(fn, *args):
+    """fn(conn, *args)를 쓰기용 연결로 실행하고 결과를 반환합니다. fn이 직접 커밋합니다."""
     conn = sqlite3.connect(METADATA_DB_PATH, timeout=60)
-    conn.execute('PRAGMA journal_mode=WAL;')
-    conn.execute('PRAGMA synchronous=NORMAL;')
-    while True:
-        items = db_queue.get()
-        if items is None: break
-        try:
-            conn.executemany('''
-                INSERT OR REPLACE INTO entries
-                (path_hash, parent_hash, abs_path, rel_path, name, is_dir, poster_url, title, depth, last_scanned, metadata)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?)
-            ''', items)
-            conn.commit()
-        except Exception as e:
-            logger.error("DB Write Error: " + str(e))
-        finally:
-            db_queue.task_done()
-
-threading.Thread(target=db_writer_worker, daemon=True).start()
+    try: return fn(conn, *args)
+    finally: conn.close()
+
+def save_entries(conn, items):
+    """entries 저장의 단일 진입점."""
+    conn.executemany('''
+        INSERT OR REPLACE INTO entries
+        (path_hash, parent_hash, abs_path, rel_path, name, is_dir, poster_url, title, depth, last_scanned, metadata)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?)
+    ''', items)
+    conn.commit()
 
 def init_db():
+    os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+    os.makedirs(TILE_CACHE_DIR, exist_ok=True)
     conn = sqlite3.connect(METADATA_DB_PATH)
     with conn:
         conn.execute('''CREATE TABLE IF NOT EXISTS entries (
@@ -110,6 +147,10 @@ def init_db():
             poster_url TEXT, title TEXT, depth INTEGER, last_scanned REAL,
             metadata TEXT
         )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_parent ON entries(parent_hash)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS posters (
+            path_hash TEXT PRIMARY KEY, fingerprint TEXT, poster TEXT, resolved REAL
+        )''')
     conn.close()
 
 # --- 정보 추출 엔진 ---
@@ -137,7 +178,7 @@ def generate_file_thumbnail(file_path, cache_path):
 def generate_zip_thumbnail(zip_path, cache_path):
     if os.path.exists(cache_path): return True
     try:
-        with zipfile.ZipFile(zip_path, 'r') as z:
+        with archive_handles.acquire(zip_path) as z:
             imgs = sorted([n for n in z.namelist() if is_image_file(n)])
             if imgs:
                 target = imgs[min(2, len(imgs)-1)]
@@ -148,6 +189,92 @@ def generate_zip_thumbnail(zip_path, cache_path):
     except: pass
     return False
 
+def read_entry_bytes(abs_p, entry):
+    """폴더 또는 ZIP 아카이브 안의 이미지 엔트리를 읽습니다."""
+    if os.path.isdir(abs_p):
+        with open(os.path.join(abs_p, entry), 'rb') as f: return f.read()
+    with archive_handles.acquire(abs_p) as z:
+        with z.open(entry) as f: return f.read()
+
+def get_tile_geometry(height, tile_height):
+    """세로 길이를 tile_height 단위로 나눈 [(y, h), ...] 목록을 반환합니다."""
+    if tile_height <= 0: raise ValueError(f"tile_height must be positive: {tile_height}")
+    if not height or height <= tile_height: return [(0, height or 0)]
+    return [(y, min(tile_height, height - y)) for y in range(0, height, tile_height)]
+
+def parse_tile_height(default=None):
+    """요청의 tile_height를 읽습니다. 없으면 default, 범위를 벗어나거나 숫자가 아니면 ValueError."""
+    raw = request.args.get('tile_height')
+    if raw is None or raw == '': return default
+    try: value = int(raw)
+    except ValueError: value = None
+    if value is None or not MIN_TILE_HEIGHT <= value <= MAX_TILE_HEIGHT:
+        raise ValueError(f"tile_height must be between {MIN_TILE_HEIGHT} and {MAX_TILE_HEIGHT}")
+    return value
+
+def remember_page_size(key, size):
+    with page_size_lock:
+        page_size_cache[key] = size
+        while len(page_size_cache) > PAGE_SIZE_CACHE_MAX: page_size_cache.popitem(last=False)
+    return size
+
+def get_page_sizes(abs_p, entries):
+    """각 페이지의 (width, height)를 이미지 헤더만 읽어 구합니다. (PIL의 지연 로딩 사용)"""
+    if not HAS_PIL: return {}
+    mtime = os.path.getmtime(abs_p)
+    sizes, missing = {}, []
+    with page_size_lock:
+        for e in entries:
+            key = (abs_p, mtime, e)
+            if key in page_size_cache:
+                page_size_cache.move_to_end(key)
+                sizes[e] = page_size_cache[key]
+            else: missing.append(e)
+    if not missing: return sizes
+    try:
+        if os.path.isdir(abs_p):
+            for e in missing:
+                with Image.open(os.path.join(abs_p, e)) as im: sizes[e] = remember_page_size((abs_p, mtime, e), im.size)
+        else:
+            with archive_handles.acquire(abs_p) as z:
+                for e in missing:
+                    with z.open(e) as f, Image.open(f) as im: sizes[e] = remember_page_size((abs_p, mtime, e), im.size)
+    except Exception as ex:
+        logger.error(f"Page Size Error in {abs_p}: {ex}")
+    return sizes
+
+def get_tile_prefix(abs_p, entry, tile_height):
+    key = f"{normalize_nfc(abs_p)}|{entry}|{tile_height}|{os.path.getmtime(abs_p)}"
+    return os.path.join(TILE_CACHE_DIR, hashlib.md5(key.encode('utf-8')).hexdigest())
+
+def generate_tiles(abs_p, entry, tile_height):
+    """한 페이지를 tile_height 높이의 JPEG 조각들로 잘라 디스크에 캐시합니다. 생성된 조각 수를 반환합니다.
+    캐시 정리로 조각 일부만 지워졌을 수 있으므로, 헤더의 높이로 구한 조각이 하나라도 없으면 전체를 다시 만듭니다."""
+    prefix = get_tile_prefix(abs_p, entry, tile_height)
+    height = get_page_sizes(abs_p, [entry]).get(entry, (None, None))[1]
+    if height:
+        count = len(get_tile_geometry(height, tile_height))
+        if all(os.path.exists(f"{prefix}_{i}.jpg") for i in range(count)): return count
+    with Image.open(io.BytesIO(read_entry_bytes(abs_p, entry))) as im:
+        im = im.convert('RGB')
+        geometry = get_tile_geometry(im.height, tile_height)
+        for i, (y, h) in enumerate(geometry):
+            tmp = f"{prefix}_{i}.tmp"
+            im.crop((0, y, im.width, y + h)).save(tmp, format='JPEG', quality=85)
+            os.replace(tmp, f"{prefix}_{i}.jpg")
+    return len(geometry)
+
+def ensure_tiles(abs_p, entry, tile_height):
+    """타일 생성 작업을 풀에 제출하고 Future를 반환합니다. 이미 진행 중이면 같은 Future를 공유합니다."""
+    key = (abs_p, entry, tile_height)
+    with tile_jobs_lock:
+        fut = tile_jobs.get(key)
+        if fut is None:
+            fut = tile_pool.submit(run_profiled, 'generate_tiles', generate_tiles, abs_p, entry, tile_height)
+            tile_jobs[key] = fut
+            fut.add_done_callback(lambda _f: tile_jobs.pop(key, None))
+    return fut
+
 def find_first_image_recursive(path, depth_limit=4):
     if depth_limit <= 0: return None
     try:
@@ -168,14 +295,86 @@ def find_first_image_recursive(path, depth_limit=4):
     except: pass
     return None
 
-def get_comic_info(abs_path, rel_path):
+def read_listing(abs_path):
+    """폴더를 한 번 읽어 (이름, 절대 경로, 폴더 여부) 목록을 반환합니다."""
+    with os.scandir(abs_path) as it:
+        return [(normalize_nfc(e.name), e.path, e.is_dir()) for e in it]
+
+def get_folder_fingerprint(abs_path):
+    st = os.stat(abs_path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def quote_poster(poster):
+    if not poster or poster.startswith("http"): return poster
+    if poster.startswith("zip_thumb://"): return "zip_thumb://" + urllib.parse.quote(poster[12:], safe='/')
+    if poster.startswith("poster://"): return "poster://" + urllib.parse.quote(poster[9:], safe='/')
+    return urllib.parse.quote(poster, safe='/')
+
+def defer_poster(abs_path, rel_path, listing):
+    """폴더에 바로 쓸 이미지가 없을 때: 캐시된 포스터가 폴더 지문과 맞으면 그대로 쓰고, 아니면 후보만 기록해 둡니다."""
+    h = get_path_hash(abs_path)
+    fp = get_folder_fingerprint(abs_path)
+    conn = sqlite3.connect(METADATA_DB_PATH, timeout=20)
+    row = conn.execute("SELECT fingerprint, poster FROM posters WHERE path_hash = ?", (h,)).fetchone()
+    conn.close()
+    if row and row[0] == fp: return row[1], False
+    visible = sorted((n, p, d) for n, p, d in listing if not n.startswith('.') and not is_excluded(n))
+    subdirs = [p for n, p, d in visible if d][:5]
+    comics = [p for n, p, d in visible if not d and is_comic_file(n)]
+    poster_candidates[h] = (fp, subdirs, comics[0] if comics else None)
+    return "poster://" + rel_path, True
+
+def resolve_poster(abs_path):
+    """지연된 포스터를 확정하고 posters 캐시와 entries(폴더 및 같은 포스터를 물려받은 하위 항목)를 갱신합니다."""
+    h = get_path_hash(abs_path)
+    fp = get_folder_fingerprint(abs_path)
+    conn = sqlite3.connect(METADATA_DB_PATH, timeout=20)
+    try: row = conn.execute("SELECT fingerprint, poster FROM posters WHERE path_hash = ?", (h,)).fetchone()
+    finally: conn.close()
+    if row and row[0] == fp: return row[1]
+    cand = poster_candidates.pop(h, None)
+    if cand and cand[0] == fp:
+        poster = None
+        for sd in cand[1]:
+            poster = find_first_image_recursive(sd, depth_limit=3)
+            if poster: break
+        if not poster and cand[2]: poster = "zip_thumb://" + os.path.relpath(cand[2], BASE_PATH).replace(os.sep, '/')
+    else:
+        poster = find_first_image_recursive(abs_path, depth_limit=4)
+    rel = normalize_nfc(os.path.relpath(abs_path, BASE_PATH).replace(os.sep, '/'))
+    db_write(save_poster, h, fp, poster, rel)
+    return poster
+
+def save_poster(conn, h, fp, poster, rel):
+    conn.execute("INSERT OR REPLACE INTO posters VALUES (?, ?, ?, ?)", (h, fp, poster, time.time()))
+    conn.execute("UPDATE entries SET poster_url = ? WHERE (path_hash = ? OR parent_hash = ?) AND poster_url = ?",
+                 (quote_poster(poster), h, h, quote_poster("poster://" + rel)))
+    conn.commit()
+
+def resolve_poster_job(abs_path):
+    try: resolve_poster(abs_path)
+    except Exception as e: logger.error(f"Poster resolve error in {abs_path}: {e}")
+    finally:
+        with poster_lock: poster_pending.discard(abs_path)
+
+def schedule_poster(abs_path):
+    with poster_lock:
+        if abs_path in poster_pending: return
+        poster_pending.add(abs_path)
+    poster_pool.submit(run_profiled, 'resolve_poster', resolve_poster_job, abs_path)
+
+def get_comic_info(abs_path, rel_path, listing=None):
+    """(title, poster, meta_json, 포스터 지연 여부). 폴더는 listing(이미 읽은 목록)만으로 판단하며 추가로 폴더를 읽지 않습니다."""
     title = normalize_nfc(os.path.basename(abs_path))
     poster = None
+    deferred = False
     meta_dict = {"summary": "줄거리 정보가 없습니다.", "writers": [], "genres": [], "status": "Unknown", "publisher": ""}
     if os.path.isdir(abs_path):
-        kavita_path = os.path.join(abs_path, "kavita.yaml")
-        if not os.path.exists(kavita_path): kavita_path = os.path.join(abs_path, "Kavita.yaml")
-        if os.path.exists(kavita_path):
+        if listing is None: listing = read_listing(abs_path)
+        files = set(n for n, p, d in listing if not d)
+        kavita_name = "kavita.yaml" if "kavita.yaml" in files else "Kavita.yaml" if "Kavita.yaml" in files else None
+        if kavita_name:
+            kavita_path = os.path.join(abs_path, kavita_name)
             try:
                 with open(kavita_path, 'r', encoding='utf-8') as f:
                     data = yaml.safe_load(f)
@@ -190,15 +389,16 @@ def get_comic_info(abs_path, rel_path):
                             if val.startswith(('http://', 'https://')): poster = val; break
                             poster = os.path.join(rel_path, val).replace(os.sep, '/'); break
             except: pass
-        if not poster: poster = find_first_image_recursive(abs_path, depth_limit=4)
+        if not poster:
+            images = [n for n in files if not n.startswith('.') and is_image_file(n) and not is_excluded(n)]
+            if images: poster = os.path.join(rel_path, min(images)).replace(os.sep, '/')
+            else: poster, deferred = defer_poster(abs_path, rel_path, listing)
     else:
         poster = "zip_thumb://" + rel_path
         title = os.path.splitext(title)[0]
-    if poster and not poster.startswith("http"):
-        if poster.startswith("zip_thumb://"): poster = "zip_thumb://" + urllib.parse.quote(poster[12:], safe='/')
-        else: poster = urllib.parse.quote(poster, safe='/')
+    poster = quote_poster(poster)
     meta_dict['poster_url'] = poster
-    return title, poster, json.dumps(meta_dict, ensure_ascii=False)
+    return title, poster, json.dumps(meta_dict, ensure_ascii=False), deferred
 
 def scan_folder_sync(abs_path, series_depth):
     try:
@@ -208,41 +408,35 @@ def scan_folder_sync(abs_path, series_depth):
         if rel == ".": rel = ""
         depth = get_depth(rel)
         scan_status["current_item"] = os.path.basename(abs_path)
-        has_comic_files = False
-        if os.path.isdir(abs_path):
-            with os.scandir(abs_path) as it:
-                for e in it:
-                    if is_comic_file(e.name): has_comic_files = True; break
+        # 폴더 읽기는 한 번만: 시리즈 판정, kavita.yaml/포스터 후보, 하위 항목 모두 이 목록으로 처리합니다.
+        listing = read_listing(abs_path) if os.path.isdir(abs_path) else []
+        has_comic_files = any(is_comic_file(n) for n, p, d in listing)
         is_series_level = (depth >= series_depth) or has_comic_files
-        title, poster, meta = get_comic_info(abs_path, rel)
+        title, poster, meta, poster_deferred = get_comic_info(abs_path, rel, listing)
         item = (get_path_hash(abs_path), get_path_hash(os.path.dirname(abs_path)), abs_path, rel, os.path.basename(abs_path), 1 if os.path.isdir(abs_path) else 0, poster, title, depth, time.time(), meta)
 
         # 1. 현재 폴더 정보 저장
         conn = sqlite3.connect(METADATA_DB_PATH, timeout=20)
-        conn.execute('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', item)
+        save_entries(conn, [item])
 
         # 2. 직계 하위 항목들 즉시 스캔 (브라우징을 위해)
         child_items = []
-        if os.path.isdir(abs_path):
-            with os.scandir(abs_path) as it:
-                for e in it:
-                    if not is_excluded(e.name) and (e.is_dir() or is_comic_file(e.name)):
-                        e_rel = normalize_nfc(os.path.relpath(e.path, BASE_PATH).replace(os.sep, '/'))
-                        # 하위 항목의 포스터는 일단 부모 포스터나 기본값으로 빠르게 설정 (상세 스캔은 나중에)
-                        e_poster = "zip_thumb://" + urllib.parse.quote(e_rel, safe='/') if is_comic_file(e.name) else poster
-                        child_items.append((get_path_hash(e.path), get_path_hash(abs_path), normalize_nfc(e.path), e_rel, normalize_nfc(e.name), 1 if e.is_dir() else 0, e_poster, normalize_nfc(os.path.splitext(e.name)[0]), depth + 1, time.time(), "{}"))
-            if child_items:
-                conn.executemany('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)', child_items)
-
-        conn.commit()
+        for name, e_path, e_is_dir in listing:
+            if not is_excluded(name) and (e_is_dir or is_comic_file(name)):
+                e_rel = normalize_nfc(os.path.relpath(e_path, BASE_PATH).replace(os.sep, '/'))
+                # 하위 항목의 포스터는 일단 부모 포스터나 기본값으로 빠르게 설정 (상세 스캔은 나중에)
+                e_poster = "zip_thumb://" + urllib.parse.quote(e_rel, safe='/') if is_comic_file(name) else poster
+                child_items.append((get_path_hash(e_path), get_path_hash(abs_path), normalize_nfc(e_path), e_rel, name, 1 if e_is_dir else 0, e_poster, normalize_nfc(os.path.splitext(name)[0]), depth + 1, time.time(), "{}"))
+        if child_items: save_entries(conn, child_items)
         conn.close()
+        if poster_deferred: schedule_poster(abs_path)
 
         # 3. 비동기 전체 스캔 (하위 깊이까지)
         if not is_series_level and os.path.isdir(abs_path):
             for child in child_items:
                 if child[5] == 1: # Directory
                     scan_status["total"] += 1
-                    scanning_pool.submit(scan_task, child[2], series_depth)
+                    scanning_pool.submit(run_profiled, 'scan_task', scan_task, child[2], series_depth)
 
         scan_status["processed"] += 1
         scan_status["success"] += 1
@@ -258,6 +452,84 @@ def scan_task(abs_path, series_depth):
         scan_status["is_running"] = False
         add_web_log(f"{scan_status['current_type']} Completed!", "SUCCESS")
 
+# --- 샘플링 프로파일러 (선택) ---
+# 활성화 시 모든 요청/작업의 스택을 PROFILE_INTERVAL 간격으로 샘플링하고,
+# PROFILE_SAMPLE_RATE 확률로 뽑힌 요청과 PROFILE_SLOW_MS 보다 느린 요청만 보관합니다. (구현: NasShared.Profiler)
+PROFILE_ENABLED = False
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_SLOW_MS = 1000
+PROFILE_INTERVAL = 0.005
+PROFILE_MAX_CAPTURES = 200
+
+profiler = NasShared.Profiler(logger, PROFILE_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, PROFILE_INTERVAL,
+                              PROFILE_MAX_CAPTURES)
+
+def run_profiled(name, fn, *args, **kwargs):
+    """백그라운드 작업(스캔 등)을 요청과 같은 방식으로 프로파일링하며 실행합니다."""
+    return profiler.run(name, fn, *args, **kwargs)
+
+@app.before_request
+def profile_before_request():
+    g.profile = profiler.start('request', request.path, request.args.to_dict(flat=False))
+
+@app.teardown_request
+def profile_teardown_request(exc):
+    profiler.stop(g.pop('profile', None))
+
+@app.route('/metadata/profiles')
+def list_profiles():
+    return jsonify(profiler.info())
+
+@app.route('/metadata/profiles/<int:pid>')
+def download_profile(pid):
+    """캡처 하나를 flamegraph.pl / speedscope 에서 읽을 수 있는 collapsed-stack 텍스트로 내려줍니다."""
+    body = profiler.folded(pid)
+    if body is None: return "Profile Not Found", 404
+    return Response(body, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename=profile_{pid}.folded'})
+
+# --- 부하 제어 (Admission Control) ---
+# 요청을 등급별로 나눠 동시 실행 수와 대기열 길이를 제한합니다. 우선순위: page > thumbnail > metadata > scan
+# 전체 동시 실행 수(ADMISSION_TOTAL_LIMIT)가 찼을 때는 우선순위가 높은 등급의 대기 요청부터 들어갑니다.
+ADMISSION_ENABLED = True
+ADMISSION_TOTAL_LIMIT = 24
+ADMISSION_RETRY_AFTER = 2
+ADMISSION_PRIORITY = ['page', 'thumbnail', 'metadata', 'scan']
+ADMISSION_CLASSES = {
+    'page': {'limit': 16, 'queue': 64, 'timeout': 10},
+    'thumbnail': {'limit': 8, 'queue': 32, 'timeout': 3},
+    'metadata': {'limit': 8, 'queue': 32, 'timeout': 5},
+    'scan': {'limit': 2, 'queue': 4, 'timeout': 1},
+}
+ROUTE_CLASSES = {
+    '/download_zip_entry': 'page', '/zip_entries': 'page',
+    '/download': 'thumbnail',
+    '/scan': 'metadata', '/metadata': 'metadata', '/files': 'metadata',
+}
+
+admission = NasShared.AdmissionControl(ADMISSION_CLASSES, ADMISSION_PRIORITY, ADMISSION_TOTAL_LIMIT)
+
+def admission_degraded_response(cls):
+    """썸네일 등급이 포화되면 이미 캐시된 썸네일이 있는 경우에만 디스크에서 바로 돌려줍니다."""
+    if cls != 'thumbnail': return None
+    p = normalize_nfc(urllib.parse.unquote(request.args.get('path', ''))).replace('+', ' ')
+    if not p.startswith("zip_thumb://"): return None
+    cache_key = hashlib.md5(normalize_nfc(p[12:]).encode('utf-8')).hexdigest() + ".jpg"
+    if not os.path.exists(os.path.join(THUMB_CACHE_DIR, cache_key)): return None
+    return send_from_directory(THUMB_CACHE_DIR, cache_key)
+
+@app.before_request
+def admission_before_request():
+    return admission.before_request(ROUTE_CLASSES, admission_degraded_response, ADMISSION_RETRY_AFTER, ADMISSION_ENABLED)
+
+@app.teardown_request
+def admission_teardown_request(exc):
+    admission.teardown_request()
+
+@app.route('/metadata/admission')
+def admission_info():
+    return jsonify(dict(admission.info(), enabled=ADMISSION_ENABLED))
+
 @app.route('/files')
 def list_files():
     path = normalize_nfc(urllib.parse.unquote(request.args.get('path', '')))
@@ -313,6 +585,13 @@ def download():
     raw_path = request.args.get('path', '')
     p = normalize_nfc(urllib.parse.unquote(raw_path)).replace('+', ' ')
     if not p: return "Path required", 400
+    if p.startswith("poster://"):
+        # 지연된 포스터: 첫 표시 때 확정하고 (이후엔 posters 캐시), 확정된 이미지로 이어서 처리합니다.
+        try: p = resolve_poster(get_abs_path(p[9:]))
+        except Exception as e:
+            logger.error(f"Poster resolve error in {p}: {e}")
+            p = None
+        if not p: return "No Image", 404
     if p.startswith("http"):
         try:
             req = urllib.request.Request(p, headers={'User-Agent': 'Mozilla/5.0'})
@@ -349,10 +628,24 @@ def zip_entries():
                 return jsonify(pages)
             except: return jsonify([])
         return jsonify([])
-    if os.path.isdir(abs_p): return jsonify(sorted([e.name for e in os.scandir(abs_p) if is_image_file(e.name)]))
     try:
-        with zipfile.ZipFile(abs_p, 'r') as z: return jsonify(sorted([n for n in z.namelist() if is_image_file(n)]))
+        if os.path.isdir(abs_p): entries = sorted([e.name for e in os.scandir(abs_p) if is_image_file(e.name)])
+        else:
+            with archive_handles.acquire(abs_p) as z: entries = sorted([n for n in z.namelist() if is_image_file(n)])
     except: return jsonify([])
+    # tile_height 가 주어지면 페이지별 해상도와 조각 구성을 함께 내려주고, 조각 생성을 미리 시작합니다.
+    try: tile_height = parse_tile_height()
+    except ValueError as e: return jsonify({'error': str(e)}), 400
+    if not tile_height: return jsonify(entries)
+    sizes = get_page_sizes(abs_p, entries)
+    pages = []
+    for e in entries:
+        w, h = sizes.get(e, (None, None))
+        geometry = get_tile_geometry(h, tile_height) if HAS_PIL and h else [(0, h)]
+        if len(geometry) > 1: ensure_tiles(abs_p, e, tile_height)
+        pages.append({'name': e, 'width': w, 'height': h, 'tile_count': len(geometry),
+                      'tiles': [{'index': i, 'y': y, 'height': th} for i, (y, th) in enumerate(geometry)]})
+    return jsonify({'tile_height': tile_height, 'pages': pages})
 
 @app.route('/download_zip_entry')
 def download_zip_entry():
@@ -369,9 +662,22 @@ def download_zip_entry():
             doc.close()
             return send_file(io.BytesIO(img_data), mimetype='image/jpeg')
         except: return "Error", 500
+    # tile 모드: 긴 스트립을 tile_height 높이로 자른 조각 하나를 반환합니다.
+    tile = request.args.get('tile', type=int)
+    if tile is not None and HAS_PIL:
+        try: tile_height = parse_tile_height(DEFAULT_TILE_HEIGHT)
+        except ValueError as e: return str(e), 400
+        try:
+            ensure_tiles(abs_p, entry, tile_height).result(timeout=60)
+            tile_name = os.path.basename(get_tile_prefix(abs_p, entry, tile_height)) + f"_{tile}.jpg"
+            if os.path.exists(os.path.join(TILE_CACHE_DIR, tile_name)): return send_from_directory(TILE_CACHE_DIR, tile_name)
+            return "Tile Not Found", 404
+        except Exception as e:
+            logger.error(f"Tile Error {abs_p}:{entry}: {e}")
+            return "Error", 500
     if os.path.isdir(abs_p): return send_from_directory(abs_p, entry)
     try:
-        with zipfile.ZipFile(abs_p, 'r') as z:
+        with archive_handles.acquire(abs_p) as z:
             with z.open(entry) as f: return send_file(io.BytesIO(f.read()), mimetype='image/jpeg')
     except: return "Error", 500
 
@@ -407,6 +713,14 @@ def get_metadata():
     conn.close()
     return jsonify(meta)
 
-if __name__ == '__main__':
+def start_services():
+    """색인 초기화. (단독 실행과 다중 라이브러리 호스트 공용)"""
     init_db()
-    app.run(host='0.0.0.0', port=5556, threaded=True)
+
+if __name__ == '__main__':
+    start_services()
+    if SERVE_MODE == 'asgi':
+        import NasAsgi
+        NasAsgi.serve(app, '0.0.0.0', 5556, ASGI_WORKERS, admission)
+    else:
+        app.run(host='0.0.0.0', port=5556, threaded=True)
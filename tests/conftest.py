@@ -0,0 +1,39 @@
+import os, sys, zipfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_archive(path, pages=1):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, 'w') as z:
+        for i in range(pages): z.writestr(f"{i:03d}.jpg", b'')
+
+
+@pytest.fixture
+def comics(tmp_path, monkeypatch):
+    """임시 라이브러리 루트와 DB를 가리키도록 설정한 만화 서버 모듈."""
+    import NasComicsViewerServer as server
+    root = tmp_path / "lib"
+    root.mkdir()
+    monkeypatch.setattr(server, 'BASE_PATH', str(root).replace(os.sep, '/'))
+    monkeypatch.setattr(server, 'METADATA_DB_PATH', str(tmp_path / "comics.db"))
+    monkeypatch.setattr(server, 'REPLICA_MODE', False)
+    monkeypatch.setattr(server, 'HAS_PIL', False)  # 플레이스홀더 백그라운드 생성은 끕니다.
+    server.init_db()
+    server.cache_clear()
+    return server
+
+
+@pytest.fixture
+def webtoon(tmp_path, monkeypatch):
+    """임시 라이브러리 루트와 캐시 폴더를 가리키도록 설정한 웹툰 서버 모듈."""
+    import NasWebtoonViewerServer as server
+    root = tmp_path / "webtoon"
+    root.mkdir()
+    monkeypatch.setattr(server, 'BASE_PATH', str(root).replace(os.sep, '/'))
+    monkeypatch.setattr(server, 'METADATA_DB_PATH', str(tmp_path / "webtoon.db"))
+    monkeypatch.setattr(server, 'THUMB_CACHE_DIR', str(tmp_path / "webtoon_cache"))
+    monkeypatch.setattr(server, 'TILE_CACHE_DIR', str(tmp_path / "webtoon_cache" / "tiles"))
+    server.init_db()
+    return server
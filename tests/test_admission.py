@@ -0,0 +1,117 @@
+import threading, time
+
+from flask import Flask, Response
+
+import NasShared
+
+CLASSES = {
+    'page': {'limit': 2, 'queue': 1, 'timeout': 1},
+    'scan': {'limit': 1, 'queue': 0, 'timeout': 0.05},
+}
+
+
+def make(total_limit=3, max_waiters=None):
+    return NasShared.AdmissionControl(CLASSES, ['page', 'scan'], total_limit, max_waiters)
+
+
+def wait_until(cond, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_class_limit_and_release():
+    adm = make()
+    assert adm.acquire('scan')
+    assert not adm.acquire('scan')  # queue 0 → 바로 거절
+    adm.release('scan')
+    assert adm.acquire('scan')
+    st = adm.state['scan']
+    assert (st['active'], st['waiting'], st['admitted'], st['rejected']) == (1, 0, 2, 1)
+
+
+def test_total_limit_applies_across_classes():
+    adm = make(total_limit=2)
+    assert adm.acquire('page') and adm.acquire('scan')
+    assert not adm.acquire('scan')
+    assert adm.info()['total_active'] == 2
+
+
+def test_waiter_is_admitted_when_slot_frees():
+    adm = make()
+    assert adm.acquire('page') and adm.acquire('page')
+    result = {}
+    t = threading.Thread(target=lambda: result.update(ok=adm.acquire('page')))
+    t.start()
+    wait_until(lambda: adm.state['page']['waiting'] == 1)
+    assert not adm.acquire('page')  # 대기열(1)이 가득 참
+    adm.release('page')
+    t.join()
+    assert result['ok']
+    assert adm.state['page']['active'] == 2 and adm.state['page']['waiting'] == 0
+
+
+def test_higher_priority_waiter_goes_first():
+    adm = make(total_limit=2)
+    assert adm.acquire('page') and adm.acquire('page')
+    t = threading.Thread(target=adm.acquire, args=('page',))
+    t.start()
+    wait_until(lambda: adm.state['page']['waiting'] == 1)
+    adm.release('page')
+    t.join()
+    assert not adm.acquire('scan')  # 전체 한도가 다시 page 로 찼음
+
+
+def test_max_waiters_caps_total_waiting():
+    adm = make(max_waiters=0)
+    assert adm.acquire('page') and adm.acquire('page')
+    started = time.monotonic()
+    assert not adm.acquire('page')  # 등급 대기열은 남았지만 전체 대기 수 상한이 0
+    assert time.monotonic() - started < 0.5
+    assert adm.state['page']['rejected'] == 1
+
+
+def flask_app(adm, degraded=None):
+    app = Flask(__name__)
+    routes = {'/page': 'page', '/scan': 'scan'}
+
+    @app.before_request
+    def admit():
+        return adm.before_request(routes, lambda cls: degraded, 7)
+
+    @app.teardown_request
+    def done(exc):
+        adm.teardown_request()
+
+    @app.route('/page')
+    def page(): return "page"
+
+    @app.route('/scan')
+    def scan(): return "scan"
+
+    @app.route('/free')
+    def free(): return "free"
+
+    return app
+
+
+def test_hooks_release_slot_and_shed_with_retry_after():
+    adm = make()
+    client = flask_app(adm).test_client()
+    assert client.get('/page').data == b"page"
+    assert adm.state['page']['active'] == 0 and adm.state['page']['admitted'] == 1
+
+    assert adm.acquire('scan')  # 다른 요청이 scan 슬롯을 쥐고 있음
+    r = client.get('/scan')
+    assert r.status_code == 503 and r.headers['Retry-After'] == '7'
+    assert client.get('/free').status_code == 200  # 등급이 없는 라우트는 제한하지 않음
+
+
+def test_degraded_response_is_counted():
+    adm = make()
+    client = flask_app(adm, degraded=Response("lqip")).test_client()
+    assert adm.acquire('scan')
+    r = client.get('/scan')
+    assert r.data == b"lqip"
+    assert adm.state['scan']['degraded'] == 1 and adm.state['scan']['active'] == 1
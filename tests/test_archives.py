@@ -0,0 +1,47 @@
+import os, shutil, subprocess, sys
+
+import pytest
+
+
+@pytest.fixture
+def library(comics, tmp_path, monkeypatch):
+    monkeypatch.setattr(comics, 'PAGE_CACHE_DIR', str(tmp_path / "page_cache"))
+    monkeypatch.setitem(sys.modules, 'py7zr', None)  # 설치 여부와 무관하게 외부 도구 경로를 씁니다.
+    folder = os.path.join(comics.BASE_PATH, "완결A", "작품")
+    os.makedirs(folder)
+    return comics, folder
+
+
+def make_cb7(folder, name):
+    if not shutil.which('bsdtar'): pytest.skip("bsdtar not installed")
+    for page, data in [("002.jpg", b'second'), ("001.jpg", b'first')]:
+        with open(os.path.join(folder, page), 'wb') as f: f.write(data)
+    subprocess.run(['bsdtar', '--format', '7zip', '-cf', name, '001.jpg', '002.jpg'], cwd=folder, check=True)
+    for page in ["001.jpg", "002.jpg"]: os.remove(os.path.join(folder, page))
+    return os.path.join(folder, name)
+
+
+def test_poster_reads_one_member_without_filling_page_cache(library):
+    comics, folder = library
+    make_cb7(folder, "1권.cb7")
+    assert comics.read_poster_bytes("zip_thumb://완결A/작품/1권.cb7") == b'first'
+    assert not os.path.exists(comics.PAGE_CACHE_DIR) or not os.listdir(comics.PAGE_CACHE_DIR)
+
+
+def test_extractor_failure_is_unavailable_not_500(library):
+    comics, folder = library
+    if not any(shutil.which(t) for t in ('7z', '7zz', '7za', 'bsdtar')): pytest.skip("no 7z extractor installed")
+    with open(os.path.join(folder, "broken.cb7"), 'wb') as f: f.write(b'not an archive')
+    client = comics.app.test_client()
+    resp = client.get("/download_zip_entry", query_string={'path': "완결A/작품/broken.cb7", 'entry': "001.jpg"})
+    assert resp.status_code == 501
+
+
+def test_zip_entries_without_extractor_is_501(library, monkeypatch):
+    comics, folder = library
+    make_cb7(folder, "1권.cb7")
+    monkeypatch.setattr(comics.shutil, 'which', lambda tool: None)
+    client = comics.app.test_client()
+    assert client.get("/zip_entries", query_string={'path': "완결A/작품/1권.cb7"}).status_code == 501
+    assert client.get("/download_zip_entry", query_string={'path': "완결A/작품/1권.cb7",
+                                                           'entry': "001.jpg"}).status_code == 501
@@ -0,0 +1,100 @@
+import asyncio, threading, time
+
+import NasAsgi
+import NasShared
+
+
+def make_wsgi(release):
+    def app(environ, start_response):
+        if environ.get(NasShared.OVERLOAD_ENVIRON_KEY):
+            start_response('503 Service Unavailable', [('Retry-After', '2')])
+            return [b'busy']
+        release.wait(5)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+    return app
+
+
+def make_receive(disconnect=None):
+    """본문 한 번을 돌려준 뒤에는 disconnect가 설정될 때까지 기다리는 receive. (ASGI 서버와 같은 동작)"""
+    disconnect = disconnect or asyncio.Event()
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if messages: return messages.pop()
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+    return receive
+
+
+async def call(asgi_app, path='/'):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': []}
+    sent = []
+    receive = make_receive()
+
+    async def send(msg): sent.append(msg)
+
+    await asgi_app(scope, receive, send)
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_requests_over_worker_count_are_shed_not_queued():
+    release = threading.Event()
+    asgi_app = NasAsgi.make_asgi_app(make_wsgi(release), max_workers=2)
+
+    async def main():
+        running = [asyncio.create_task(call(asgi_app)) for _ in range(2)]
+        while asgi_app.in_flight.active < 2: await asyncio.sleep(0.01)
+        shed = await asyncio.wait_for(call(asgi_app), 2)  # 실행 스레드가 모두 사용 중 → 바로 과부하 경로
+        release.set()
+        return shed, await asyncio.gather(*running)
+
+    shed, done = asyncio.run(main())
+    assert shed == (503, b'busy')
+    assert done == [(200, b'ok'), (200, b'ok')]
+    assert asgi_app.in_flight.active == 0 and asgi_app.in_flight.stats['overloaded'] == 1
+
+
+def test_fit_admission_leaves_threads_for_admitted_requests():
+    adm = NasShared.AdmissionControl({'page': {'limit': 4, 'queue': 8, 'timeout': 1}}, ['page'], 24)
+    NasAsgi.fit_admission(adm, 32)
+    assert adm.max_waiters == 8
+    NasAsgi.fit_admission(adm, 16)
+    assert adm.max_waiters == 0
+
+
+def test_disconnect_mid_stream_stops_iterating_and_frees_the_slot():
+    produced, closed = [], threading.Event()
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+        def stream():
+            try:
+                for i in range(1000):
+                    produced.append(i)
+                    yield b'chunk'
+                    time.sleep(0.01)
+            finally:
+                closed.set()
+        return stream()
+
+    asgi_app = NasAsgi.make_asgi_app(app, max_workers=1)
+    scope = {'type': 'http', 'method': 'GET', 'path': '/scan_stream', 'headers': []}
+
+    async def main():
+        disconnect = asyncio.Event()
+        sent = []
+
+        async def send(msg):
+            sent.append(msg)  # uvicorn처럼 끊긴 뒤에도 예외 없이 반환
+            if len(sent) == 4: disconnect.set()
+
+        await asyncio.wait_for(asgi_app(scope, make_receive(disconnect), send), 5)
+        return sent
+
+    sent = asyncio.run(main())
+    assert closed.is_set()
+    assert len(produced) < 10
+    assert not any(m.get('more_body') is False for m in sent)
+    assert asgi_app.in_flight.active == 0 and asgi_app.in_flight.stats['disconnected'] == 1
@@ -0,0 +1,71 @@
+import os, shutil
+
+from conftest import make_archive
+
+
+def fetch(client, since, limit=None):
+    url = f"/changes?since={since}" + (f"&limit={limit}" if limit else "")
+    resp = client.get(url)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def sync(client, since, limit):
+    """more가 false가 될 때까지 페이지를 넘기며 받은 변경을 모읍니다."""
+    changes = []
+    while True:
+        page = fetch(client, since, limit)
+        changes += page['changes']
+        since = page['next']
+        if not page['more']: return changes, since
+
+
+def test_cursor_pages_through_every_change(comics):
+    cat = os.path.join(comics.BASE_PATH, "완결A")
+    for name in ["A", "B", "C"]: make_archive(os.path.join(cat, name, "1권", "001.zip"))
+    comics.scan_folder_sync(cat, 3)
+    client = comics.app.test_client()
+
+    changes, cursor = sync(client, 0, 2)
+    paths = [c['path'] for c in changes]
+    assert len(paths) == len(set(paths)) == 10  # 카테고리 + 작품 3 × (폴더, 권, 파일)
+    assert all(c['op'] == 'i' for c in changes)
+    assert [c['seq'] for c in changes] == sorted(c['seq'] for c in changes)
+
+    # 이어받기: 새 변경만, 삭제는 op 'd'로
+    shutil.rmtree(os.path.join(cat, "B"))
+    comics.remove_stale_children(cat, comics.scan_folder_sync(cat, 0))
+    changes, _ = sync(client, cursor, 2)
+    assert {c['path'] for c in changes} == {"완결A/B", "완결A/B/1권", "완결A/B/1권/001.zip"}
+    assert all(c['op'] == 'd' for c in changes)
+
+
+def test_rescan_without_changes_is_not_logged(comics):
+    cat = os.path.join(comics.BASE_PATH, "완결A")
+    make_archive(os.path.join(cat, "A", "1권", "001.zip"))
+    comics.scan_folder_sync(cat, 3)
+    client = comics.app.test_client()
+    _, cursor = sync(client, 0, 100)
+
+    comics.scan_folder_sync(cat, 3)
+    assert fetch(client, cursor)['changes'] == []
+
+
+def test_cursor_older_than_floor_requests_reset(comics, monkeypatch):
+    cat = os.path.join(comics.BASE_PATH, "완결A")
+    make_archive(os.path.join(cat, "A", "1권", "001.zip"))
+    make_archive(os.path.join(cat, "B", "1권", "001.zip"))
+    comics.scan_folder_sync(cat, 3)
+    client = comics.app.test_client()
+    _, cursor = sync(client, 0, 100)
+
+    shutil.rmtree(os.path.join(cat, "B"))
+    comics.remove_stale_children(cat, comics.scan_folder_sync(cat, 0))
+    monkeypatch.setattr(comics, 'CHANGES_RETENTION_SEC', -1)
+    comics.compact_changes()
+
+    page = fetch(client, cursor)
+    assert page['reset'] is True and page['changes'] == []
+    assert page['next'] == page['latest'] >= page['floor'] > cursor
+    # latest부터는 정상적으로 이어받습니다.
+    assert fetch(client, page['latest'])['reset'] is False
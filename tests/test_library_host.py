@@ -0,0 +1,91 @@
+import pytest
+
+import NasLibraryHost
+
+
+def library(tmp_path, name, **settings):
+    root = tmp_path / name
+    root.mkdir(exist_ok=True)
+    return {'name': name, 'type': 'comics', 'root': str(root), 'db': str(tmp_path / f"{name}.db"),
+            'categories': [], 'settings': settings}
+
+
+def host(tmp_path, *libs):
+    return NasLibraryHost.LibraryHost(dict(NasLibraryHost.HOST_DEFAULTS), list(libs))
+
+
+def test_host_managed_settings_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="host.archive_handles"):
+        NasLibraryHost.load_library(library(tmp_path, "a", ARCHIVE_HANDLE_LIMIT=4))
+    with pytest.raises(ValueError, match="Unknown setting"):
+        NasLibraryHost.load_library(library(tmp_path, "b", NOT_A_SETTING=1))
+
+
+def test_profiler_is_rebuilt_from_settings(tmp_path):
+    module = NasLibraryHost.load_library(library(tmp_path, "c", PROFILE_ENABLED=True, PROFILE_SLOW_MS=5))
+    assert module.profiler.enabled and module.profiler.slow_ms == 5
+
+
+def test_new_admission_class_from_settings_is_usable(tmp_path):
+    classes = {'page': {'limit': 4, 'queue': 4, 'timeout': 1}, 'bulk': {'limit': 1, 'queue': 0, 'timeout': 1}}
+    lib = library(tmp_path, "d", ADMISSION_CLASSES=classes, ADMISSION_PRIORITY=['page', 'bulk'],
+                  ROUTE_CLASSES={'/zip_bundle': 'bulk', '/download_zip_entry': 'page'})
+    h = host(tmp_path, lib)
+    module = h.libraries[0][1]
+    assert module.admission is h.admission
+    assert h.admission.acquire('bulk')
+    r = module.app.test_client().get('/zip_bundle?path=missing.zip')
+    assert r.status_code == 503  # bulk 슬롯이 이미 사용 중 (KeyError 없이 부하 제어 경로로)
+
+
+def test_route_class_without_admission_class_fails_at_startup(tmp_path):
+    lib = library(tmp_path, "e", ROUTE_CLASSES={'/zip_bundle': 'bulk'})
+    with pytest.raises(ValueError, match="bulk"):
+        host(tmp_path, lib)
+
+
+def test_cache_budget_is_split_per_library(tmp_path):
+    h = host(tmp_path, library(tmp_path, "f"), library(tmp_path, "g"))
+    total = int(NasLibraryHost.HOST_DEFAULTS['cache_budget_gb'] * 1024 ** 3)
+    assert all(m.PAGE_CACHE_MAX_BYTES == total // 2 for _, m in h.libraries)
+    assert h.cache_budget.max_bytes == 0 and h.cache_budget.dirs == []
+
+
+def test_all_index_writes_go_through_the_shared_writer(tmp_path):
+    from conftest import make_archive
+    h = host(tmp_path, library(tmp_path, "h"))
+    module = h.libraries[0][1]
+    module.init_db()
+    archive = tmp_path / "h" / "작품" / "001.zip"
+    make_archive(str(archive), pages=2)
+
+    writes = h.db_writer.stats['writes']
+    r = module.app.test_client().post('/metadata/inject', data={'category': "작품", 'title': "테스트"})
+    assert r.status_code == 200  # save_entries
+    assert module.build_manifest(str(archive))  # 매니페스트
+    module.compact_changes()  # 변경 로그 정리
+    module.db_write(module.save_placeholders, [("k", "zip_thumb://a", None, 0.0)])  # 플레이스홀더
+    assert h.db_writer.stats['writes'] == writes + 4 and h.db_writer.stats['errors'] == 0
+
+
+def test_comics_libraries_share_one_placeholder_pool(tmp_path):
+    pytest.importorskip("PIL")
+    h = host(tmp_path, library(tmp_path, "i"), library(tmp_path, "j"))
+    pools = [m.placeholder_proc_pool for _, m in h.libraries]
+    assert pools[0] is not None and pools[0] is pools[1] is h.placeholder_proc_pool
+    for _, m in h.libraries: m.start_placeholder_pool()
+    assert all(m.placeholder_proc_pool is h.placeholder_proc_pool for _, m in h.libraries)
+
+
+def test_webtoon_poster_resolution_uses_the_shared_writer(tmp_path):
+    lib = dict(library(tmp_path, "k"), type='webtoon')
+    h = host(tmp_path, lib)
+    module = h.libraries[0][1]
+    module.init_db()
+    episode = tmp_path / "k" / "작품" / "1화"
+    episode.mkdir(parents=True)
+    (episode / "001.jpg").write_bytes(b'x')
+
+    writes = h.db_writer.stats['writes']
+    assert module.resolve_poster(str(tmp_path / "k" / "작품").replace('\\', '/')) == "작품/1화/001.jpg"
+    assert h.db_writer.stats['writes'] == writes + 1
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def page_cache(comics, tmp_path, monkeypatch):
+    monkeypatch.setattr(comics, 'PAGE_CACHE_DIR', str(tmp_path / "page_cache"))
+    monkeypatch.setattr(comics, 'PAGE_CACHE_MAX_BYTES', 0)  # 새로 푼 폴더 말고는 모두 정리 대상
+    return comics
+
+
+def make_source(tmp_path, name):
+    p = tmp_path / name
+    p.write_bytes(name.encode())
+    return str(p)
+
+
+def fake_archive(server):
+    class FakeArchive(server.ExtractedArchive):
+        def extract(self, dest):
+            with open(os.path.join(dest, "001.jpg"), 'wb') as f: f.write(b'x' * 10)
+    return FakeArchive
+
+
+def test_extractor_must_implement_extract(comics):
+    with pytest.raises(TypeError):
+        comics.ExtractedArchive("/nonexistent")
+
+
+def test_eviction_skips_archives_in_use(page_cache, tmp_path):
+    FakeArchive = fake_archive(page_cache)
+    first = FakeArchive(make_source(tmp_path, "a.cbr"))
+    second = FakeArchive(make_source(tmp_path, "b.cbr"))  # 정리가 돌지만 first는 읽는 중이라 남아야 합니다.
+    assert os.path.isdir(first.dir)
+    assert first.read("001.jpg") == b'x' * 10
+
+    first.close()
+    FakeArchive(make_source(tmp_path, "c.cbr")).close()
+    assert not os.path.isdir(first.dir)
+    second.close()
+
+
+def test_idle_entries_are_dropped(page_cache, tmp_path):
+    FakeArchive = fake_archive(page_cache)
+    a = FakeArchive(make_source(tmp_path, "a.cbr"))
+    assert a.key in page_cache.page_cache_entries
+    a.close()
+    a.close()  # 두 번 닫아도 안전
+    assert page_cache.page_cache_entries == {}
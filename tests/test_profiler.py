@@ -0,0 +1,25 @@
+import logging, threading
+
+import NasShared
+
+
+def test_stop_on_another_thread_only_ends_its_own_capture():
+    profiler = NasShared.Profiler(logging.getLogger("test"), enabled=True, sample_rate=1.0)
+    started = {}
+    t = threading.Thread(target=lambda: started.update(cap=profiler.start('request', '/a', {})))
+    t.start(); t.join()
+    other = profiler.start('request', '/b', {})  # 이 스레드에서 진행 중인 다른 요청
+
+    profiler.stop(started['cap'])  # /a 의 정리 단계가 다른 스레드(여기)에서 실행됨
+
+    assert list(profiler.active.values()) == [other]
+    assert other['thread'] == threading.get_ident()
+    profiler.stop(other)
+    assert profiler.active == {}
+    assert [c['route'] for c in profiler.info()['captures']] == ['/b', '/a']
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = NasShared.Profiler(logging.getLogger("test"))
+    assert profiler.run('job', lambda: 42) == 42
+    assert profiler.info()['captures'] == []
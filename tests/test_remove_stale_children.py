@@ -0,0 +1,90 @@
+import os, shutil, sqlite3
+
+from conftest import make_archive
+
+
+def rel_paths(server):
+    conn = sqlite3.connect(server.METADATA_DB_PATH)
+    try: return set(r[0] for r in conn.execute("SELECT rel_path FROM entries"))
+    finally: conn.close()
+
+
+def deleted_paths(server):
+    conn = sqlite3.connect(server.METADATA_DB_PATH)
+    try: return set(r[0] for r in conn.execute("SELECT rel_path FROM changes WHERE op = 'd'"))
+    finally: conn.close()
+
+
+def build_library(server, names):
+    cat = os.path.join(server.BASE_PATH, "완결A")
+    for name in names:
+        make_archive(os.path.join(cat, name, "1권", "001.zip"))
+    server.scan_folder_sync(cat, 3)
+    return cat
+
+
+def test_removes_whole_subtree_of_missing_folder(comics):
+    cat = build_library(comics, ["A_B", "Other"])
+    assert "완결A/A_B/1권/001.zip" in rel_paths(comics)
+
+    shutil.rmtree(os.path.join(cat, "A_B"))
+    removed = comics.remove_stale_children(cat, comics.scan_folder_sync(cat, 0))
+
+    assert removed == 3
+    assert not any(p.startswith("완결A/A_B") for p in rel_paths(comics))
+    assert deleted_paths(comics) == {"완결A/A_B", "완결A/A_B/1권", "완결A/A_B/1권/001.zip"}
+    assert "완결A/Other/1권/001.zip" in rel_paths(comics)
+
+
+def test_like_wildcards_and_case_do_not_match_siblings(comics):
+    cat = build_library(comics, ["A_B", "AxB", "a_b", "A%B"])
+
+    shutil.rmtree(os.path.join(cat, "A_B"))
+    comics.remove_stale_children(cat, comics.scan_folder_sync(cat, 0))
+
+    remaining = rel_paths(comics)
+    for sibling in ("AxB", "a_b", "A%B"):
+        assert f"완결A/{sibling}/1권/001.zip" in remaining
+    assert not any(p.startswith("완결A/A_B") for p in remaining)
+    assert all(p.startswith("완결A/A_B") for p in deleted_paths(comics))
+
+
+def test_unchanged_folder_removes_nothing(comics):
+    cat = build_library(comics, ["A_B"])
+    before = rel_paths(comics)
+
+    assert comics.remove_stale_children(cat, comics.scan_folder_sync(cat, 0)) == 0
+    assert rel_paths(comics) == before
+    assert deleted_paths(comics) == set()
+
+
+def test_category_filter_matches_prefix_exactly(comics):
+    build_library(comics, ["A_B"])
+    make_archive(os.path.join(comics.BASE_PATH, "완결AxB", "X", "001.zip"))
+    comics.scan_folder_sync(os.path.join(comics.BASE_PATH, "완결AxB"), 2)
+
+    where, params = comics.subtree_clause("완결A")
+    conn = sqlite3.connect(comics.METADATA_DB_PATH)
+    rows = set(r[0] for r in conn.execute(f"SELECT rel_path FROM entries WHERE {where}", params))
+    conn.close()
+    assert rows and all(p.startswith("완결A/") for p in rows)
+
+
+def test_mixed_case_category_path_finds_children(comics, monkeypatch):
+    build_library(comics, ["A_B", "Other"])
+    scans = []
+    monkeypatch.setattr(comics, 'scan_folder_sync', lambda *a: scans.append(a) or [])
+    client = comics.app.test_client()
+
+    resp = client.get("/scan", query_string={'path': "완결a"})
+    assert resp.status_code == 200
+    assert sorted(it['path'] for it in resp.get_json()['items']) == ["완결A/A_B/1권", "완결A/Other/1권"]
+    assert scans == []  # 색인에 있으므로 다시 스캔하지 않음
+
+
+def test_empty_category_is_scanned_once(comics, monkeypatch):
+    scans = []
+    monkeypatch.setattr(comics, 'scan_folder_sync', lambda *a: scans.append(a) or [])
+    resp = comics.app.test_client().get("/scan", query_string={'path': "완결B"})
+    assert resp.status_code == 200 and resp.get_json()['items'] == []
+    assert len(scans) == 1
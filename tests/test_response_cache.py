@@ -0,0 +1,43 @@
+import os
+
+from conftest import make_archive
+
+
+def scan(client, path):
+    return [it['name'] for it in client.get("/scan", query_string={'path': path}).get_json()['items']]
+
+
+def test_write_between_query_and_put_is_not_cached(comics, monkeypatch):
+    cat = os.path.join(comics.BASE_PATH, "완결A")
+    make_archive(os.path.join(cat, "작품", "1권", "001.zip"))
+    comics.scan_folder_sync(cat, 3)
+    client = comics.app.test_client()
+    get_placeholders = comics.get_placeholders
+
+    def write_during_request(conn, poster_urls):
+        # 요청이 행을 읽은 뒤, 캐시에 넣기 전에 다른 스레드의 쓰기가 커밋된 상황
+        monkeypatch.setattr(comics, 'get_placeholders', get_placeholders)
+        make_archive(os.path.join(cat, "작품", "2권", "001.zip"))
+        comics.scan_folder_sync(os.path.join(cat, "작품"), 0)
+        return get_placeholders(conn, poster_urls)
+
+    monkeypatch.setattr(comics, 'get_placeholders', write_during_request)
+    stats = dict(comics.response_cache_stats)
+    assert scan(client, "완결A/작품") == ["1권"]
+    assert comics.response_cache_stats['stale_skips'] == stats['stale_skips'] + 1
+    assert scan(client, "완결A/작품") == ["1권", "2권"]  # 이전 결과가 캐시에 남지 않음
+    assert scan(client, "완결A/작품") == ["1권", "2권"]
+    assert comics.response_cache_stats['hits'] == stats['hits'] + 1
+
+
+def test_snapshot_swap_during_request_is_not_cached(comics):
+    key = ('/scan', ())
+    with comics.app.test_request_context('/scan'):
+        assert comics.cache_get(key) is None
+        comics.cache_clear()  # activate_snapshot이 그 사이 DB를 교체
+        comics.cached_jsonify(key, [('tree', '')], {'items': ['old']})
+    with comics.app.test_request_context('/scan'):
+        assert comics.cache_get(key) is None
+        comics.cached_jsonify(key, [('tree', '')], {'items': ['new']})
+    with comics.app.test_request_context('/scan'):
+        assert comics.cache_get(key).get_json() == {'items': ['new']}
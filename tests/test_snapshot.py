@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from conftest import make_archive
+
+
+@pytest.fixture
+def snapshot(comics, tmp_path, monkeypatch):
+    monkeypatch.setattr(comics, 'SNAPSHOT_DIR', str(tmp_path / "snapshots"))
+    monkeypatch.setattr(comics, 'replica_status', dict(comics.replica_status, active_snapshot=None, swaps=0))
+    cat = os.path.join(comics.BASE_PATH, "완결A")
+    make_archive(os.path.join(cat, "작품", "1권", "001.zip"))
+    comics.scan_folder_sync(cat, 3)
+    return os.path.join(comics.SNAPSHOT_DIR, comics.export_snapshot()['file'])
+
+
+def test_snapshot_for_same_base_path_activates(comics, snapshot, monkeypatch):
+    monkeypatch.setattr(comics, 'REPLICA_MODE', True)
+    comics.activate_snapshot(snapshot)
+    assert comics.METADATA_DB_PATH == snapshot
+    items = comics.app.test_client().get("/scan", query_string={'path': "완결A/작품"}).get_json()['items']
+    assert [it['name'] for it in items] == ["1권"]
+
+
+def test_snapshot_for_other_base_path_is_refused(comics, snapshot, monkeypatch, tmp_path):
+    monkeypatch.setattr(comics, 'REPLICA_MODE', True)
+    before = comics.METADATA_DB_PATH
+    monkeypatch.setattr(comics, 'BASE_PATH', str(tmp_path / "mounted" / "elsewhere"))
+    with pytest.raises(ValueError, match="BASE_PATH"):
+        comics.activate_snapshot(snapshot)
+    assert comics.METADATA_DB_PATH == before and comics.replica_status['swaps'] == 0
+
+
+def test_fetch_discards_snapshot_for_other_base_path(comics, snapshot, monkeypatch, tmp_path):
+    monkeypatch.setattr(comics, 'REPLICA_SOURCE', os.path.dirname(snapshot))
+    monkeypatch.setattr(comics, 'SNAPSHOT_DIR', str(tmp_path / "replica"))
+    monkeypatch.setattr(comics, 'BASE_PATH', str(tmp_path / "mounted" / "elsewhere"))
+    with pytest.raises(ValueError, match="BASE_PATH"):
+        comics.fetch_latest_snapshot()
+    assert os.listdir(comics.SNAPSHOT_DIR) == []
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+
+@pytest.fixture
+def strip(webtoon):
+    folder = os.path.join(webtoon.BASE_PATH, "가", "작품", "1화")
+    os.makedirs(folder)
+    Image.new('RGB', (100, 2500), 'white').save(os.path.join(folder, "001.jpg"))
+    return "가/작품/1화"
+
+
+def get_tile(client, path, tile):
+    return client.get("/download_zip_entry", query_string={'path': path, 'entry': "001.jpg", 'tile': tile,
+                                                           'tile_height': 1000})
+
+
+def test_evicted_middle_tile_is_rebuilt(webtoon, strip):
+    client = webtoon.app.test_client()
+    assert get_tile(client, strip, 1).status_code == 200
+    prefix = webtoon.get_tile_prefix(webtoon.get_abs_path(strip), "001.jpg", 1000)
+    assert all(os.path.exists(f"{prefix}_{i}.jpg") for i in range(3))
+
+    os.remove(f"{prefix}_1.jpg")  # 캐시 정리가 가운데 조각만 지운 상황
+    resp = get_tile(client, strip, 1)
+    assert resp.status_code == 200
+    with Image.open(f"{prefix}_1.jpg") as im: assert im.size == (100, 1000)
+
+
+def test_tile_past_the_end_is_not_found(webtoon, strip):
+    client = webtoon.app.test_client()
+    assert get_tile(client, strip, 2).status_code == 200
+    assert get_tile(client, strip, 3).status_code == 404